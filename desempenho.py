@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Medições de desempenho do renderizador.
+
+Desenvolvido por: Luciano Soares <lpsoares@insper.edu.br>
+Disciplina: Computação Gráfica
+Data: 18 de Outubro de 2026
+"""
+
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "renderizador"))
+
+import x3d  # pylint: disable=wrong-import-position
+
+DIR = "docs/exemplos/"
+
+# Campos com vários valores e o decodificador usado por cada um
+CAMPOS = {
+    "point": x3d.decode_floats,
+    "color": x3d.decode_floats,
+    "vertices": x3d.decode_floats,
+    "key": x3d.decode_floats,
+    "keyValue": x3d.decode_floats,
+    "coordIndex": x3d.decode_ints,
+    "colorIndex": x3d.decode_ints,
+    "texCoordIndex": x3d.decode_ints,
+    "index": x3d.decode_ints,
+    "stripCount": x3d.decode_ints,
+}
+
+
+def cronometra(funcao, repeticoes=3):
+    """Retorna o menor tempo (em segundos) de algumas execuções da função."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def parser():
+    """Compara o decodificador de campos original com o baseado no Numpy."""
+    print("{0:20} {1:>10} {2:>12} {3:>12} {4:>8} {5:>12} {6:>10}".format(
+        "malha", "valores", "original(s)", "numpy(s)", "ganho", "leitura(s)", "cache(s)"))
+    for arquivo in sorted(glob.glob(os.path.join(DIR, "3D/malhas/*/*.x3d"))):
+        # Coleta o texto de todos os campos com vários valores do arquivo
+        textos = []
+        for elemento in xml.etree.ElementTree.parse(arquivo).iter():
+            for campo, decodificador in CAMPOS.items():
+                texto = elemento.attrib.get(campo, "").strip()
+                if texto:
+                    textos.append((texto, decodificador))
+
+        # Os dois decodificadores devem produzir exatamente os mesmos valores
+        total = 0
+        for texto, decodificador in textos:
+            conversao = int if decodificador is x3d.decode_ints else float
+            valores = decodificador(texto)
+            if valores != x3d.split_values(texto, conversao):
+                sys.exit(f"Resultados diferentes em {arquivo}")
+            total += len(valores)
+
+        original = cronometra(lambda: [x3d.split_values(t, int if d is x3d.decode_ints else float)
+                                       for t, d in textos])
+        numpy = cronometra(lambda: [d(t) for t, d in textos])
+
+        # Tempo total de leitura do arquivo com o decodificador atual
+        def leitura(nome=arquivo):
+            x3d.X3DNode.named_nodes = {}
+            x3d.X3D(nome).parse()
+        carga = cronometra(leitura)
+
+        # Tempo de leitura a partir do cache binário (.x3dc) da cena
+        def leitura_cache(nome=arquivo):
+            x3d.X3DNode.named_nodes = {}
+            x3d.X3D(nome, cache=True).parse()
+        leitura_cache()  # grava o cache
+        cache = cronometra(leitura_cache)
+        os.remove(os.path.splitext(arquivo)[0] + ".x3dc")
+
+        nome = os.path.splitext(os.path.basename(arquivo))[0]
+        print("{0:20} {1:10} {2:12.4f} {3:12.4f} {4:7.1f}x {5:12.4f} {6:10.4f}".format(
+            nome, total, original, numpy, original / max(numpy, 1e-9), carga, cache))
+
+
+# Módulos da interface gráfica que não podem ser carregados no modo silencioso
+PROIBIDOS = ("matplotlib", "qtpy", "PyQt5", "PyQt6", "PySide2", "PySide6", "interface")
+
+def inicializacao():
+    """Mede as importações de uma renderização silenciosa (python -X importtime)."""
+    arquivo = os.path.join(DIR, "3D/malhas/um_triangulo/um_triangulo.x3d")
+    with tempfile.TemporaryDirectory() as pasta:
+        comando = [sys.executable, "-X", "importtime", "renderizador/renderizador.py",
+                   "-i", arquivo, "-q", "-o", os.path.join(pasta, "tela.png")]
+        inicio = time.perf_counter()
+        resultado = subprocess.run(comando, capture_output=True, text=True, check=True)
+        total = time.perf_counter() - inicio
+
+    # Cada linha tem o formato "import time: próprio | acumulado | módulo" (em us)
+    modulos = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        _, acumulado, modulo = linha[len("import time:"):].split("|")
+        modulos.append((int(acumulado), modulo.rstrip()))
+
+    raizes = [(tempo, modulo) for tempo, modulo in modulos if not modulo.startswith("  ")]
+    print("{0:30} {1:>12}".format("módulo", "importação(s)"))
+    for tempo, modulo in sorted(raizes, reverse=True)[:10]:
+        print("{0:30} {1:12.4f}".format(modulo.strip(), tempo / 1e6))
+    print("{0:30} {1:12.4f}".format("total importações", sum(t for t, _ in raizes) / 1e6))
+    print("{0:30} {1:12.4f}".format("execução completa", total))
+
+    carregados = sorted({m.strip() for _, m in modulos if m.strip().split(".")[0] in PROIBIDOS})
+    if carregados:
+        sys.exit("Modo silencioso carregou a interface gráfica: " + ", ".join(carregados))
+
+
+def culling():
+    """Tempo por quadro do bound500 com e sem o descarte pelo volume de visualização."""
+    import renderizador  # pylint: disable=import-outside-toplevel
+    arquivo = os.path.join(DIR, "3D/grafo_de_cena/bound500/bound500.x3d")
+    quadro = renderizador.Renderizador()
+    with tempfile.TemporaryDirectory() as pasta:
+        quadro.render_file(arquivo, os.path.join(pasta, "tela.png"), 300, 200)
+    cena = quadro.scene.scene
+    frustum = x3d.X3D.renderer.pop("Frustum")
+
+    print("{0:12} {1:>10} {2:>12} {3:>12} {4:>8}".format(
+        "câmera (z)", "visíveis", "sem(s)", "com(s)", "ganho"))
+    for distancia in (35, 15, 8, 3):
+        cena.viewpoint.position = [0, 0, distancia]
+        sem = cronometra(quadro.render)
+        x3d.X3D.renderer["Frustum"] = frustum
+        com = cronometra(quadro.render)
+        visiveis = int(cena.draw_list.visible(frustum()).sum())
+        del x3d.X3D.renderer["Frustum"]
+        print("{0:12} {1:10} {2:12.4f} {3:12.4f} {4:7.1f}x".format(
+            distancia, visiveis, sem, com, sem / max(com, 1e-9)))
+    x3d.X3D.renderer["Frustum"] = frustum
+
+
+def lod():
+    """Qualidade e tempo das primitivas com subdivisão fixa e escolhida pelo tamanho na tela."""
+    import renderizador  # pylint: disable=import-outside-toplevel
+    import gl  # pylint: disable=import-outside-toplevel
+    import gpu  # pylint: disable=import-outside-toplevel
+    import primitivas  # pylint: disable=import-outside-toplevel
+
+    # Cena com esferas, cones e cilindros em profundidades cada vez maiores
+    formas = ["<Sphere radius='0.25'/>", "<Cone bottomRadius='0.25' height='0.5'/>",
+              "<Cylinder radius='0.25' height='0.5'/>"]
+    cena = ["<X3D><Scene><Viewpoint position='0 0 4'/>"]
+    for linha in range(6):
+        distancia = 6 * 1.6 ** linha  # cada linha mais distante da câmera que a anterior
+        for coluna in range(12):
+            x, y = (coluna - 5.5) * 0.12 * distancia, (2.5 - linha) * 0.15 * distancia
+            cena.append(f"<Transform translation='{x} {y} {4 - distancia}'><Shape>"
+                        f"<Appearance><Material diffuseColor='0.8 0.6 0.2'/></Appearance>"
+                        f"{formas[(linha + coluna) % 3]}</Shape></Transform>")
+    cena.append("</Scene></X3D>")
+
+    quadro = renderizador.Renderizador()
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, "lod.x3d")
+        with open(arquivo, "w", encoding="utf-8") as saida:
+            saida.write("\n".join(cena))
+
+        print("{0:16} {1:>10} {2:>14}".format("subdivisão", "quadro(s)", "diferença(%)"))
+        referencia = None
+        for nome, nivel, automatico in (("fixa 64", 64, False), ("fixa 24", 24, False),
+                                        ("pela tela", None, True)):
+            primitivas.LEVEL = nivel or primitivas.LEVEL
+            gl.GL.lod = automatico
+            quadro.render_file(arquivo, os.path.join(pasta, "tela.png"), 600, 400)
+            tempo = cronometra(quadro.render)
+            imagem = gpu.GPU.get_frame_buffer().copy()
+            if referencia is None:
+                referencia = imagem
+            # Compara só a silhueta, as cores variam por arredondamento entre triângulos
+            diferenca = np.mean(np.any(imagem, axis=2) != np.any(referencia, axis=2)) * 100
+            print("{0:16} {1:10.4f} {2:14.3f}".format(nome, tempo, diferenca))
+    primitivas.LEVEL = 24
+    gl.GL.lod = True
+
+
+def interpoladores():
+    """Avaliação de animações longas: reconstruindo a cada fração, nó pré-calculado e vetorizada."""
+    import interpoladores as modulo  # pylint: disable=import-outside-toplevel
+    gerador = np.random.default_rng(0)
+    print("{0:14} {1:>8} {2:>12} {3:>12} {4:>12} {5:>8}".format(
+        "interpolador", "chaves", "refaz(s)", "nó(s)", "vetor(s)", "ganho"))
+    for chaves in (10, 1000, 10000):
+        key = np.linspace(0, 1, chaves).tolist()
+        eixos = gerador.normal(size=(chaves, 3))
+        casos = (("spline", lambda k, v: modulo.Spline(k, v, False),
+                  gerador.normal(size=chaves * 3).tolist()),
+                 ("orientação", modulo.Orientation,
+                  np.hstack((eixos, gerador.uniform(0, 6, (chaves, 1)))).reshape(-1).tolist()))
+        fracoes = gerador.uniform(0, 1, 1000)
+        for nome, construtor, valores in casos:
+            # Reconstruir a cada avaliação equivale a reprocessar as listas a cada quadro
+            refaz = cronometra(lambda: [construtor(key, valores).value(f) for f in fracoes[:100]], 1) * 10
+            interpolador = construtor(key, valores)
+            no = cronometra(lambda: [interpolador.value(f) for f in fracoes])
+            vetor = cronometra(lambda: interpolador.values(fracoes))
+            print("{0:14} {1:8} {2:12.4f} {3:12.4f} {4:12.4f} {5:7.1f}x".format(
+                nome, chaves, refaz, no, vetor, refaz / max(vetor, 1e-9)))
+
+
+def texturas():
+    """Fragmentos texturizados por segundo com laço por fragmento e com cada filtro vetorizado."""
+    import gpu  # pylint: disable=import-outside-toplevel
+    import texturas as modulo  # pylint: disable=import-outside-toplevel
+    gerador = np.random.default_rng(0)
+    imagem = gerador.integers(0, 256, (1024, 1024, 3), dtype=np.uint8)
+    niveis = gpu.mipmaps(imagem)
+    fragmentos = 2**20
+    u, v = gerador.uniform(-1, 2, (2, fragmentos))
+    escala = 2.0 ** gerador.uniform(-12, -6, fragmentos)  # de 1/4 a 16 texels por pixel
+    derivadas = (escala, 0 * escala, 0 * escala, escala)
+
+    # Leitura do texel mais próximo, um fragmento por vez em Python
+    def laco(quantidade=10000):
+        largura, altura = imagem.shape[:2]
+        return [imagem[int(u[i] * largura) % largura, int((1 - v[i]) * altura) % altura]
+                for i in range(quantidade)]
+    tempo = cronometra(laco, 1) * fragmentos / 10000
+
+    print("{0:12} {1:>12} {2:>16}".format("filtro", "tempo(s)", "texels/s"))
+    print("{0:12} {1:12.4f} {2:16,.0f}".format("laço", tempo, fragmentos / tempo))
+    for filtro in modulo.FILTERS:
+        tempo = cronometra(lambda f=filtro: modulo.sample(niveis, u, v, *derivadas, mode=f))
+        print("{0:12} {1:12.4f} {2:16,.0f}".format(filtro, tempo, fragmentos / tempo))
+
+
+def mapeamento():
+    """Leitura de uma textura grande decodificando a imagem e mapeando o arquivo .texc."""
+    import gpu  # pylint: disable=import-outside-toplevel
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+    gerador = np.random.default_rng(0)
+    print("{0:12} {1:>12} {2:>14} {3:>14} {4:>12}".format(
+        "textura", "MB", "decodifica(s)", "mapeia(s)", "amostra(s)"))
+    with tempfile.TemporaryDirectory() as pasta:
+        for lado in (1024, 4096):
+            arquivo = os.path.join(pasta, f"textura{lado}.png")
+            imagem = np.repeat(gerador.integers(0, 256, (lado // 4, lado // 4, 3), dtype=np.uint8), 4, axis=0)
+            Image.fromarray(np.repeat(imagem, 4, axis=1)).save(arquivo)
+
+            # Sem o arquivo .texc cada leitura decodifica a imagem e refaz os mipmaps
+            decodifica = cronometra(lambda f=arquivo: gpu.TextureCache().get(f), 1)
+            gpu.TextureCache(store=True).get(arquivo)  # grava o .texc
+            mapeia = cronometra(lambda f=arquivo: gpu.TextureCache(store=True).get(f))
+
+            # Amostrar poucos pontos de uma textura mapeada só lê as páginas usadas
+            textura = gpu.TextureCache(store=True).get(arquivo)
+            pontos = gerador.integers(0, lado, (2, 1000))
+            amostra = cronometra(lambda t=textura, p=pontos: t.image[p[0], p[1]].sum())
+            print("{0:12} {1:12.1f} {2:14.4f} {3:14.4f} {4:12.6f}".format(
+                f"{lado}x{lado}", textura.nbytes / 2**20, decodifica, mapeia, amostra))
+
+
+MEDICOES = {
+    "parser": parser,
+    "inicializacao": inicializacao,
+    "culling": culling,
+    "lod": lod,
+    "interpoladores": interpoladores,
+    "texturas": texturas,
+    "mapeamento": mapeamento,
+}
+
+if __name__ == '__main__':
+    escolhas = sys.argv[1:] or list(MEDICOES)
+    for escolha in escolhas:
+        if escolha not in MEDICOES:
+            sys.exit("Medição inválida! Opções: " + ", ".join(MEDICOES))
+        print(f"== {escolha} ==")
+        MEDICOES[escolha]()
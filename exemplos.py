@@ -27,82 +27,119 @@ def signal_handler(sig, frame):
         proc.terminate()
     sys.exit(0)
 
-# Registrando sinal para SIGINT
-signal.signal(signal.SIGINT, signal_handler)
-
-TESTE = []
-
-# Load the JSON data
-with open('docs/exemplos.json', 'r') as f:
-    data = json.load(f)
-
-# Populate the TESTE list based on the JSON data
-for section in data['examples']:
-    for example in section['examples']:
-        path = example['path']
-        x3d = example['x3d']
-        w = str(example.get('width', 640))
-        h = str(example.get('height', 480))
-        p = example.get('pause', False)
-        TESTE.append([x3d, "-i", os.path.join(DIR, path, f"{x3d}/{x3d}.x3d"), "-w", w, "-h", h]  + (["-p"] if p else []))
-
-
-# Lista os exemplos registrados (em 3 colunas)
-colunas = 4
-t = -(len(TESTE)//-colunas)
-for i in range(t):
-    for j in range(colunas):
-        d = i+j*t
-        if d < len(TESTE):
-            print("{0:2}: {1:15}".format(d, TESTE[d][0]), end="")
-    print()
-
-# Se um parâmetro fornecido, usar ele como escolha do exemplo
-outra_opcoes = []  # caso usuario passe opções que deverão ser repassadas, por exemplo: --quiet
-if len(sys.argv) > 1:
-    escolhas = sys.argv[1:]
-else:
-    escolhas = [input("Escolha o exemplo: ")]
-
-# Verifica se a escolha do exemplo foi por faixa, índice ou argumento da lista
-opcoes = []
-for escolha in escolhas:
-    if ".." in escolha:
-        try:
-            faixa = escolha.split("..")
-            for i in range(int(faixa[0]), int(faixa[1])+1):
-                opcoes.append(TESTE[i])
-        except:
-            sys.exit("Opção inválida!")
-    elif escolha.isnumeric():
-        numero = int(escolha)
-        if 0 <= numero < len(TESTE):
-            opcoes.append(TESTE[int(escolha)])
+# O script só roda no processo principal (os auxiliares do modo em lote importam o módulo)
+if __name__ == '__main__':
+    # Registrando sinal para SIGINT
+    signal.signal(signal.SIGINT, signal_handler)
+
+    TESTE = []
+
+    # Load the JSON data
+    with open('docs/exemplos.json', 'r') as f:
+        data = json.load(f)
+
+    # Populate the TESTE list based on the JSON data
+    for section in data['examples']:
+        for example in section['examples']:
+            path = example['path']
+            x3d = example['x3d']
+            w = str(example.get('width', 640))
+            h = str(example.get('height', 480))
+            p = example.get('pause', False)
+            TESTE.append([x3d, "-i", os.path.join(DIR, path, f"{x3d}/{x3d}.x3d"), "-w", w, "-h", h]  + (["-p"] if p else []))
+
+
+    # Lista os exemplos registrados (em 3 colunas)
+    colunas = 4
+    t = -(len(TESTE)//-colunas)
+    for i in range(t):
+        for j in range(colunas):
+            d = i+j*t
+            if d < len(TESTE):
+                print("{0:2}: {1:15}".format(d, TESTE[d][0]), end="")
+        print()
+
+    # Modo em lote: renderiza os exemplos sem janela num só processo (ou em --jobs=N processos)
+    # salvando as imagens em --saida=PASTA. Sem escolhas renderiza o catálogo inteiro.
+    argumentos = sys.argv[1:]
+    lote = "--batch" in argumentos
+    processos = 1
+    saida = "renders"
+    for argumento in list(argumentos):
+        if argumento.startswith("--jobs="):
+            processos = int(argumento.split("=")[1])
+        elif argumento.startswith("--saida="):
+            saida = argumento.split("=")[1]
         else:
-            sys.exit("Opção inválida!")
+            continue
+        argumentos.remove(argumento)
+    if lote:
+        argumentos.remove("--batch")
+
+    # Se um parâmetro fornecido, usar ele como escolha do exemplo
+    outra_opcoes = []  # caso usuario passe opções que deverão ser repassadas, por exemplo: --quiet
+    if argumentos:
+        escolhas = argumentos
+    elif lote:
+        escolhas = ["0..{0}".format(len(TESTE)-1)]
     else:
-        texto = [element for element in TESTE if element[0] == escolha]
-        if len(texto) > 0:
-            opcoes.append(texto[0])
+        escolhas = [input("Escolha o exemplo: ")]
+
+    # Verifica se a escolha do exemplo foi por faixa, índice ou argumento da lista
+    opcoes = []
+    for escolha in escolhas:
+        if ".." in escolha:
+            try:
+                faixa = escolha.split("..")
+                for i in range(int(faixa[0]), int(faixa[1])+1):
+                    opcoes.append(TESTE[i])
+            except:
+                sys.exit("Opção inválida!")
+        elif escolha.isnumeric():
+            numero = int(escolha)
+            if 0 <= numero < len(TESTE):
+                opcoes.append(TESTE[int(escolha)])
+            else:
+                sys.exit("Opção inválida!")
         else:
-            sys.exit("Opção inválida!")
-
-# Roda renderizador com os parâmetros necessário para o exemplo escolhido
-interpreter = sys.executable
-for opcao in opcoes:
-    print('Abrindo arquivo: "{0}"'.format(opcao[2]))
-    print("> ", interpreter, "renderizador/renderizador.py", " ".join(opcao[1:]), "\n")
-
-    proc = subprocess.Popen([interpreter, "renderizador/renderizador.py"] + opcao[1:])
-    subprocesses.append(proc)
-
-# Mantem código rodando até que o usuário pressione Ctrl+C
-try:
-    while True:
-        # Verifica se algum subprocesso ainda rodando
-        running = any(proc.poll() is None for proc in subprocesses)
-        if not running:
-            break
-        time.sleep(1)
-except KeyboardInterrupt:
-    signal_handler(signal.SIGINT, None)
\ No newline at end of file
+            texto = [element for element in TESTE if element[0] == escolha]
+            if len(texto) > 0:
+                opcoes.append(texto[0])
+            else:
+                sys.exit("Opção inválida!")
+
+    # Renderiza em lote no próprio processo, reaproveitando a GPU entre os exemplos
+    if lote:
+        sys.path.insert(0, "renderizador")
+        import renderizador  # pylint: disable=wrong-import-position,import-error
+        os.makedirs(saida, exist_ok=True)
+        trabalhos = [(opcao[2], os.path.join(saida, opcao[0] + ".png"), int(opcao[4]), int(opcao[6]), False)
+                     for opcao in opcoes]
+        inicio = time.perf_counter()
+        falhas = 0
+        for arquivo, tempo, erro in renderizador.batch(trabalhos, processos):
+            print("{0:8.3f}s {1} {2}".format(tempo, arquivo, erro or ""))
+            falhas += erro is not None
+        print("Total: {0:.3f}s, {1} exemplos, {2} falhas".format(
+            time.perf_counter() - inicio, len(trabalhos), falhas))
+        sys.exit(1 if falhas else 0)
+
+    # Roda renderizador com os parâmetros necessário para o exemplo escolhido
+    interpreter = sys.executable
+    for opcao in opcoes:
+        print('Abrindo arquivo: "{0}"'.format(opcao[2]))
+        print("> ", interpreter, "renderizador/renderizador.py", " ".join(opcao[1:]), "\n")
+
+        proc = subprocess.Popen([interpreter, "renderizador/renderizador.py"] + opcao[1:])
+        subprocesses.append(proc)
+
+    # Mantem código rodando até que o usuário pressione Ctrl+C
+    try:
+        while True:
+            # Verifica se algum subprocesso ainda rodando
+            running = any(proc.poll() is None for proc in subprocesses)
+            if not running:
+                break
+            time.sleep(1)
+    except KeyboardInterrupt:
+        signal_handler(signal.SIGINT, None)
@@ -15,6 +15,11 @@ import time         # Para operações com tempo
 import gpu          # Simula os recursos de uma GPU
 import math         # Funções matemáticas
 import numpy as np  # Biblioteca do Numpy
+import raster       # Rotinas de rasterização de triângulos
+import primitivas   # Tesselação das primitivas geométricas (com cache)
+import transformacoes  # Matrizes de transformação em coordenadas homogêneas
+import interpoladores  # Interpoladores de quadros-chave (spline e orientação)
+import texturas     # Amostragem de texturas com mipmaps
 
 class GL:
     """Classe que representa a biblioteca gráfica (Graphics Library)."""
@@ -24,13 +29,188 @@ class GL:
     near = 0.01   # plano de corte próximo
     far = 1000    # plano de corte distante
 
+    view = np.identity(4)        # matriz de visualização da câmera
+    projection = np.identity(4)  # matriz de projeção perspectiva
+    model = np.identity(4)       # matriz de modelo do Transform atual
+    stack = []                   # pilha de matrizes de modelo dos Transforms
+
+    rasterizer = None  # backend opcional de rasterização em tiles (raster.TileRasterizer)
+    lod = True  # escolhe a subdivisão das primitivas pelo tamanho delas na tela
+    samples = 1        # amostras por eixo de cada pixel (supersampling) nas primitivas 2D
+    texture_filter = texturas.TRILINEAR  # filtro usado na amostragem das texturas
+
     @staticmethod
-    def setup(width, height, near=0.01, far=1000):
+    def setup(width, height, near=0.01, far=1000, rasterizer=None, samples=1):
         """Definr parametros para câmera de razão de aspecto, plano próximo e distante."""
         GL.width = width
         GL.height = height
         GL.near = near
         GL.far = far
+        GL.samples = samples
+        GL.view = np.identity(4)
+        GL.projection = np.identity(4)
+        GL.model = np.identity(4)
+        GL.stack = []
+        GL.rasterizer = rasterizer
+
+    @staticmethod
+    def base_color(colors):
+        """Cor usada nos triângulos sem cores por vértice (0 a 1)."""
+        # Usa a cor emissiva e, se o material não emite luz, a cor difusa
+        if any(colors["emissiveColor"]):
+            return np.asarray(colors["emissiveColor"], dtype=np.float64)
+        return np.asarray(colors["diffuseColor"], dtype=np.float64)
+
+    @staticmethod
+    def project(vertices, triangles):
+        """Leva uma malha do sistema do modelo para a tela, descartando o que estiver fora."""
+        # Retorna as coordenadas (V, 3) na tela (x, y e z normalizado) e o w de recorte
+        # de cada vértice e os índices (T, 3) dos triângulos que sobraram. Com instâncias
+        # GL.model é uma pilha (K, 4, 4) e a malha é transformada por todas de uma só vez,
+        # os vértices são replicados K vezes e seus atributos devem ser também.
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        models = GL.model.reshape(-1, 4, 4)
+        matrix = GL.projection @ GL.view @ models
+        clip = (np.hstack((vertices, np.ones((len(vertices), 1)))) @
+                matrix.transpose(0, 2, 1)).reshape(-1, 4)
+        if len(models) > 1:
+            triangles = (triangles + len(vertices) * np.arange(len(models))[:, np.newaxis, np.newaxis])
+            triangles = triangles.reshape(-1, 3)
+        w = clip[:, 3]
+
+        # Descarta triângulos fora do volume entre os planos próximo e distante
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ndc = clip[:, :3] / w[:, np.newaxis]
+        valid = (w > 0) & (ndc[:, 2] >= -1) & (ndc[:, 2] <= 1)
+        triangles = triangles[np.all(valid[triangles], axis=1)]
+
+        screen = np.hstack((ndc, np.ones((len(ndc), 1)))) @ transformacoes.viewport(GL.width, GL.height).T
+        return screen[:, :3], w, triangles
+
+    @staticmethod
+    def draw_triangles(vertices, triangles, colors, vertex_colors=None):
+        """Projeta e rasteriza uma malha de triângulos definida no sistema do modelo."""
+        # O parâmetro vertices possui as coordenadas (V, 3) dos vértices, triangles os
+        # índices (T, 3) dos vértices de cada triângulo e vertex_colors, se informado,
+        # as cores (V, 3) de cada vértice a serem interpoladas no triângulo.
+        if np.size(triangles) == 0:
+            return
+        screen, w, triangles = GL.project(vertices, triangles)
+        if triangles.size == 0:
+            return
+
+        # Atributos [z, r, g, b] de cada vértice
+        if vertex_colors is None:
+            vertex_colors = np.broadcast_to(GL.base_color(colors), (len(w), 3))
+        else:
+            copies = len(w) // (np.size(vertices) // 3)  # instâncias
+            vertex_colors = np.tile(np.asarray(vertex_colors, dtype=np.float64).reshape(-1, 3), (copies, 1))
+        attrs = np.hstack((screen[:, 2:3], vertex_colors))
+
+        if GL.rasterizer:
+            GL.rasterizer.submit(screen[triangles, :2], attrs[triangles])
+        else:
+            raster.draw(screen[triangles, :2], attrs[triangles], 0, 0, GL.width, GL.height)
+
+    @staticmethod
+    def draw_textured(vertices, triangles, uvs, texture, repeat=(True, True)):
+        """Projeta e rasteriza uma malha com as cores vindas de uma textura."""
+        # O parâmetro uvs possui as coordenadas de textura (V, 2) de cada vértice e
+        # texture a textura com seus mipmaps (gpu.Texture). Os triângulos são desenhados
+        # na hora, mesmo com o backend em tiles, o teste de profundidade mantém a ordem.
+        if np.size(triangles) == 0:
+            return
+        screen, w, triangles = GL.project(vertices, triangles)
+        if triangles.size == 0:
+            return
+        copies = len(w) // (np.size(vertices) // 3)  # instâncias
+        uvs = np.tile(np.asarray(uvs, dtype=np.float64).reshape(-1, 2), (copies, 1))
+
+        # Com perspectiva u/w, v/w e 1/w é que variam linearmente na tela
+        q = 1 / w
+        linear = np.hstack((uvs * q[:, np.newaxis], q[:, np.newaxis]))
+        xy = screen[triangles, :2]
+        ddx, ddy = texturas.gradients(xy, linear[triangles])
+
+        # Cada fragmento também recebe o número do seu triângulo (constante nos vértices)
+        number = np.repeat(np.arange(len(triangles), dtype=np.float64), 3).reshape(-1, 3, 1)
+        attrs = np.concatenate((screen[triangles, 2:3], linear[triangles], number), axis=2)
+        x, y, values, _ = raster.rasterize(xy, attrs, 0, 0, GL.width, GL.height)
+        if x.size == 0:
+            return
+        tri = np.rint(values[:, 4]).astype(np.int64)
+
+        # Coordenadas de textura e suas derivadas na tela: d(u) = (d(u/w) - u d(1/w)) w
+        q = values[:, 3]
+        u = values[:, 1] / q
+        v = values[:, 2] / q
+        dx = ddx[tri]
+        dy = ddy[tri]
+        dudx = (dx[:, 0] - u * dx[:, 2]) / q
+        dvdx = (dx[:, 1] - v * dx[:, 2]) / q
+        dudy = (dy[:, 0] - u * dy[:, 2]) / q
+        dvdy = (dy[:, 1] - v * dy[:, 2]) / q
+
+        texels = texturas.sample(texture.levels, u, v, dudx, dvdx, dudy, dvdy,
+                                 repeat[0], repeat[1], GL.texture_filter)
+        if texels.shape[1] < 3:
+            texels = np.repeat(texels[:, :1], 3, axis=1)  # tons de cinza
+        gpu.GPU.draw_fragments(x, y, values[:, 0], np.clip(np.rint(texels[:, :3]), 0, 255).astype(np.uint8))
+
+    @staticmethod
+    def lod_level(radius):
+        """Nível de subdivisão de uma primitiva de raio radius pelo seu tamanho na tela."""
+        if not GL.lod:
+            return primitivas.LEVEL
+
+        # Raio projetado (em pixels) da esfera envolvente no sistema do modelo atual. Com
+        # instâncias vale a maior delas, já que todas usam a mesma malha.
+        models = GL.model.reshape(-1, 4, 4)
+        depth = -(GL.view @ models)[:, 2, 3]  # distância do centro à câmera
+        extent = radius * np.linalg.norm(models[:, :3, :3], axis=1).max(axis=1)
+        focal = GL.projection[1, 1] * GL.height / 2
+        with np.errstate(divide="ignore"):
+            pixels = np.where(depth > extent, extent * focal / depth, np.inf)
+        return primitivas.level_for(pixels.max())
+
+    @staticmethod
+    def flush():
+        """Conclui a rasterização pendente do quadro (se usando o backend em tiles)."""
+        if GL.rasterizer:
+            GL.rasterizer.flush()
+
+    @staticmethod
+    def strips(index):
+        """Converte tiras de índices separadas por -1 em triângulos."""
+        triangles = []
+        strip = []
+        for i in list(index) + [-1]:
+            if i >= 0:
+                strip.append(i)
+                continue
+            for j in range(len(strip) - 2):
+                # Alterna a ordem para manter a orientação dos triângulos
+                if j % 2 == 0:
+                    triangles.append((strip[j], strip[j+1], strip[j+2]))
+                else:
+                    triangles.append((strip[j+1], strip[j], strip[j+2]))
+            strip = []
+        return np.array(triangles, dtype=np.int64).reshape(-1, 3)
+
+    @staticmethod
+    def fans(index):
+        """Converte polígonos de índices separados por -1 em leques de triângulos."""
+        triangles = []
+        polygon = []
+        for i in list(index) + [-1]:
+            if i >= 0:
+                polygon.append(i)
+                continue
+            for j in range(1, len(polygon) - 1):
+                triangles.append((polygon[0], polygon[j], polygon[j+1]))
+            polygon = []
+        return np.array(triangles, dtype=np.int64).reshape(-1, 3)
 
     @staticmethod
     def polypoint2D(point, colors):
@@ -107,11 +287,27 @@ class GL:
         # quantidade de pontos é sempre multiplo de 3, ou seja, 6 valores ou 12 valores, etc.
         # O parâmetro colors é um dicionário com os tipos cores possíveis, para o TriangleSet2D
         # você pode assumir inicialmente o desenho das linhas com a cor emissiva (emissiveColor).
-        print("TriangleSet2D : vertices = {0}".format(vertices)) # imprime no terminal
-        print("TriangleSet2D : colors = {0}".format(colors)) # imprime no terminal as cores
-
-        # Exemplo:
-        gpu.GPU.draw_pixel([6, 8], gpu.GPU.RGB8, [255, 255, 0])  # altera pixel (u, v, tipo, r, g, b)
+        xy = np.asarray(vertices, dtype=np.float64).reshape(-1, 3, 2)
+        color = np.asarray(colors["emissiveColor"], dtype=np.float64) * 255
+        x, y, _, coverage = raster.rasterize(xy, np.zeros((len(xy), 3, 0)), 0, 0,
+                                             GL.width, GL.height, GL.samples)
+        if x.size == 0:
+            return
+
+        if GL.samples == 1:
+            gpu.GPU.draw_pixels(x, y, gpu.GPU.RGB8, color.astype(np.uint8))
+            return
+
+        # Soma a cobertura dos triângulos em cada pixel e mistura a cor com o fundo
+        pixel = y * GL.width + x
+        coverage = np.bincount(pixel, weights=coverage, minlength=GL.width * GL.height)
+        pixel = np.flatnonzero(coverage)
+        x, y = pixel % GL.width, pixel // GL.width
+        alpha = np.minimum(coverage[pixel], 1)[:, np.newaxis]
+        # O fundo vem do FrameBuffer sendo desenhado, não do quadro anterior (de leitura)
+        background = gpu.GPU.frame_buffer[gpu.GPU.draw_framebuffer].color[y, x]
+        blended = background * (1 - alpha) + color * alpha
+        gpu.GPU.draw_pixels(x, y, gpu.GPU.RGB8, np.rint(blended).astype(np.uint8))
 
 
     @staticmethod
@@ -131,12 +327,9 @@ class GL:
         # (emissiveColor), conforme implementar novos materias você deverá suportar outros
         # tipos de cores.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("TriangleSet : pontos = {0}".format(point)) # imprime no terminal pontos
-        print("TriangleSet : colors = {0}".format(colors)) # imprime no terminal as cores
-
-        # Exemplo de desenho de um pixel branco na coordenada 10, 10
-        gpu.GPU.draw_pixel([10, 10], gpu.GPU.RGB8, [255, 255, 255])  # altera pixel
+        vertices = np.asarray(point, dtype=np.float64).reshape(-1, 3)
+        triangles = np.arange(len(vertices) // 3 * 3).reshape(-1, 3)
+        GL.draw_triangles(vertices, triangles, colors)
 
     @staticmethod
     def viewpoint(position, orientation, fieldOfView):
@@ -145,14 +338,22 @@ class GL:
         # câmera virtual. Use esses dados para poder calcular e criar a matriz de projeção
         # perspectiva para poder aplicar nos pontos dos objetos geométricos.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("Viewpoint : ", end='')
-        print("position = {0} ".format(position), end='')
-        print("orientation = {0} ".format(orientation), end='')
-        print("fieldOfView = {0} ".format(fieldOfView))
+        GL.view = transformacoes.view(position, orientation)
+        GL.projection = transformacoes.perspective(fieldOfView, GL.width, GL.height,
+                                                   GL.near, GL.far)
+
+    @staticmethod
+    def frustum():
+        """Planos (a, b, c, d) do volume de visualização no sistema do mundo."""
+        # Extraídos das linhas da matriz de projeção e visualização: um ponto p está
+        # dentro do volume se a*x + b*y + c*z + d >= 0 para os seis planos
+        matrix = GL.projection @ GL.view
+        return np.array([matrix[3] + matrix[0], matrix[3] - matrix[0],
+                         matrix[3] + matrix[1], matrix[3] - matrix[1],
+                         matrix[3] + matrix[2], matrix[3] - matrix[2]])
 
     @staticmethod
-    def transform_in(translation, scale, rotation):
+    def transform_in(translation, scale, rotation, matrix=None):
         """Função usada para renderizar (na verdade coletar os dados) de Transform."""
         # A função transform_in será chamada quando se entrar em um nó X3D do tipo Transform
         # do grafo de cena. Os valores passados são a escala em um vetor [x, y, z]
@@ -165,15 +366,12 @@ class GL:
         # Quando começar a usar Transforms dentre de outros Transforms, mais a frente no curso
         # Você precisará usar alguma estrutura de dados pilha para organizar as matrizes.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("Transform : ", end='')
-        if translation:
-            print("translation = {0} ".format(translation), end='') # imprime no terminal
-        if scale:
-            print("scale = {0} ".format(scale), end='') # imprime no terminal
-        if rotation:
-            print("rotation = {0} ".format(rotation), end='') # imprime no terminal
-        print("")
+        # Se informada, matrix é a matriz do mundo já calculada e guardada pelo grafo de cena
+        GL.stack.append(GL.model)
+        if matrix is not None:
+            GL.model = matrix
+        else:
+            GL.model = GL.model @ transformacoes.model(translation, scale, rotation)
 
     @staticmethod
     def transform_out():
@@ -183,8 +381,7 @@ class GL:
         # deverá recuperar a matriz de transformação dos modelos do mundo da estrutura de
         # pilha implementada.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("Saindo de Transform")
+        GL.model = GL.stack.pop()
 
     @staticmethod
     def triangleStripSet(point, stripCount, colors):
@@ -201,15 +398,13 @@ class GL:
         # depois 2, 3 e 4, e assim por diante. Cuidado com a orientação dos vértices, ou seja,
         # todos no sentido horário ou todos no sentido anti-horário, conforme especificado.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("TriangleStripSet : pontos = {0} ".format(point), end='')
-        for i, strip in enumerate(stripCount):
-            print("strip[{0}] = {1} ".format(i, strip), end='')
-        print("")
-        print("TriangleStripSet : colors = {0}".format(colors)) # imprime no terminal as cores
-
-        # Exemplo de desenho de um pixel branco na coordenada 10, 10
-        gpu.GPU.draw_pixel([10, 10], gpu.GPU.RGB8, [255, 255, 255])  # altera pixel
+        # Cada tira vira uma lista de índices consecutivos terminada em -1
+        index = []
+        start = 0
+        for count in stripCount:
+            index += list(range(start, start + count)) + [-1]
+            start += count
+        GL.draw_triangles(point, GL.strips(index), colors)
 
     @staticmethod
     def indexedTriangleStripSet(point, index, colors):
@@ -227,16 +422,12 @@ class GL:
         # depois 2, 3 e 4, e assim por diante. Cuidado com a orientação dos vértices, ou seja,
         # todos no sentido horário ou todos no sentido anti-horário, conforme especificado.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("IndexedTriangleStripSet : pontos = {0}, index = {1}".format(point, index))
-        print("IndexedTriangleStripSet : colors = {0}".format(colors)) # imprime as cores
-
-        # Exemplo de desenho de um pixel branco na coordenada 10, 10
-        gpu.GPU.draw_pixel([10, 10], gpu.GPU.RGB8, [255, 255, 255])  # altera pixel
+        GL.draw_triangles(point, GL.strips(index), colors)
 
     @staticmethod
     def indexedFaceSet(coord, coordIndex, colorPerVertex, color, colorIndex,
-                       texCoord, texCoordIndex, colors, current_texture):
+                       texCoord, texCoordIndex, colors, current_texture, mesh=None,
+                       repeat=(True, True)):
         """Função usada para renderizar IndexedFaceSet."""
         # https://www.web3d.org/specifications/X3Dv4/ISO-IEC19775-1v4-IS/Part01/components/geometry3D.html#IndexedFaceSet
         # A função indexedFaceSet é usada para desenhar malhas de triângulos. Ela funciona de
@@ -258,24 +449,37 @@ class GL:
         # textura para o poligono, para isso, use as coordenadas de textura e depois aplique a
         # cor da textura conforme a posição do mapeamento. Dentro da classe GPU já está
         # implementadado um método para a leitura de imagens.
-
-        # Os prints abaixo são só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("IndexedFaceSet : ")
-        if coord:
-            print("\tpontos(x, y, z) = {0}, coordIndex = {1}".format(coord, coordIndex))
-        print("colorPerVertex = {0}".format(colorPerVertex))
-        if colorPerVertex and color and colorIndex:
-            print("\tcores(r, g, b) = {0}, colorIndex = {1}".format(color, colorIndex))
-        if texCoord and texCoordIndex:
-            print("\tpontos(u, v) = {0}, texCoordIndex = {1}".format(texCoord, texCoordIndex))
-        if current_texture:
-            image = gpu.GPU.load_texture(current_texture[0])
-            print("\t Matriz com image = {0}".format(image))
-            print("\t Dimensões da image = {0}".format(image.shape))
-        print("IndexedFaceSet : colors = {0}".format(colors))  # imprime no terminal as cores
-
-        # Exemplo de desenho de um pixel branco na coordenada 10, 10
-        gpu.GPU.draw_pixel([10, 10], gpu.GPU.RGB8, [255, 255, 255])  # altera pixel
+        # Se o parâmetro mesh for informado, ele já traz a malha triangulada (x3d.Mesh)
+        # com vetores de vértices, índices dos triângulos e cores por vértice resolvidos.
+        # O parâmetro repeat indica se a textura se repete em s e em t (repeatS e repeatT).
+
+        if mesh is not None and current_texture and mesh.uvs is not None:
+            GL.draw_textured(mesh.vertices, mesh.triangles, mesh.uvs,
+                             gpu.GPU.texture(current_texture[0]), repeat)
+            return
+        if mesh is not None:
+            GL.draw_triangles(mesh.vertices, mesh.triangles, colors, mesh.colors)
+            return
+
+        if not coord:
+            return
+        vertices = np.asarray(coord, dtype=np.float64).reshape(-1, 3)
+        triangles = GL.fans(coordIndex)
+
+        # Cores por vértice usam colorIndex (ou coordIndex se ele não for informado)
+        vertex_colors = None
+        if colorPerVertex and color:
+            palette = np.asarray(color, dtype=np.float64).reshape(-1, 3)
+            if colorIndex:
+                # Replica os vértices para que cada canto use sua própria cor
+                corners = GL.fans(colorIndex)
+                vertices = vertices[triangles.reshape(-1)]
+                vertex_colors = palette[corners.reshape(-1)]
+                triangles = np.arange(len(vertices)).reshape(-1, 3)
+            else:
+                vertex_colors = palette
+
+        GL.draw_triangles(vertices, triangles, colors, vertex_colors)
 
     @staticmethod
     def box(size, colors):
@@ -288,12 +492,9 @@ class GL:
         # essa caixa você vai provavelmente querer tesselar ela em triângulos, para isso
         # encontre os vértices e defina os triângulos.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("Box : size = {0}".format(size)) # imprime no terminal pontos
-        print("Box : colors = {0}".format(colors)) # imprime no terminal as cores
-
-        # Exemplo de desenho de um pixel branco na coordenada 10, 10
-        gpu.GPU.draw_pixel([10, 10], gpu.GPU.RGB8, [255, 255, 255])  # altera pixel
+        # A tesselação é feita uma única vez por tamanho e guardada em cache
+        vertices, _, triangles = primitivas.tessellate("box", size)
+        GL.draw_triangles(vertices, triangles, colors)
 
     @staticmethod
     def sphere(radius, colors):
@@ -305,9 +506,10 @@ class GL:
         # precisar tesselar ela em triângulos, para isso encontre os vértices e defina
         # os triângulos.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("Sphere : radius = {0}".format(radius)) # imprime no terminal o raio da esfera
-        print("Sphere : colors = {0}".format(colors)) # imprime no terminal as cores
+        # O nível de subdivisão depende do tamanho da esfera na tela
+        level = GL.lod_level(radius)
+        vertices, _, triangles = primitivas.tessellate("sphere", radius, level=level)
+        GL.draw_triangles(vertices, triangles, colors)
 
     @staticmethod
     def cone(bottomRadius, height, colors):
@@ -320,10 +522,9 @@ class GL:
         # Para desenha esse cone você vai precisar tesselar ele em triângulos, para isso
         # encontre os vértices e defina os triângulos.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("Cone : bottomRadius = {0}".format(bottomRadius)) # imprime no terminal o raio da base do cone
-        print("Cone : height = {0}".format(height)) # imprime no terminal a altura do cone
-        print("Cone : colors = {0}".format(colors)) # imprime no terminal as cores
+        level = GL.lod_level(max(bottomRadius, height / 2))
+        vertices, _, triangles = primitivas.tessellate("cone", bottomRadius, height, level=level)
+        GL.draw_triangles(vertices, triangles, colors)
 
     @staticmethod
     def cylinder(radius, height, colors):
@@ -336,10 +537,9 @@ class GL:
         # Para desenha esse cilindro você vai precisar tesselar ele em triângulos, para isso
         # encontre os vértices e defina os triângulos.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("Cylinder : radius = {0}".format(radius)) # imprime no terminal o raio do cilindro
-        print("Cylinder : height = {0}".format(height)) # imprime no terminal a altura do cilindro
-        print("Cylinder : colors = {0}".format(colors)) # imprime no terminal as cores
+        level = GL.lod_level(max(radius, height / 2))
+        vertices, _, triangles = primitivas.tessellate("cylinder", radius, height, level=level)
+        GL.draw_triangles(vertices, triangles, colors)
 
     @staticmethod
     def navigationInfo(headlight):
@@ -403,7 +603,7 @@ class GL:
         print("Fog : visibilityRange = {0}".format(visibilityRange))
 
     @staticmethod
-    def timeSensor(cycleInterval, loop):
+    def timeSensor(cycleInterval, loop, now=None):
         """Gera eventos conforme o tempo passa."""
         # https://www.web3d.org/specifications/X3Dv4/ISO-IEC19775-1v4-IS/Part01/components/time.html#TimeSensor
         # Os nós TimeSensor podem ser usados para muitas finalidades, incluindo:
@@ -421,13 +621,14 @@ class GL:
         print("TimeSensor : loop = {0}".format(loop))
 
         # Esse método já está implementado para os alunos como exemplo
-        epoch = time.time()  # time in seconds since the epoch as a floating point number.
+        # O instante do quadro (now) vem do relógio da cena: tempo real ou simulado
+        epoch = time.time() if now is None else now  # tempo em segundos
         fraction_changed = (epoch % cycleInterval) / cycleInterval
 
         return fraction_changed
 
     @staticmethod
-    def splinePositionInterpolator(set_fraction, key, keyValue, closed):
+    def splinePositionInterpolator(set_fraction, key, keyValue, closed, interpolator=None):
         """Interpola não linearmente entre uma lista de vetores 3D."""
         # https://www.web3d.org/specifications/X3Dv4/ISO-IEC19775-1v4-IS/Part01/components/interpolators.html#SplinePositionInterpolator
         # Interpola não linearmente entre uma lista de vetores 3D. O campo keyValue possui
@@ -438,19 +639,13 @@ class GL:
         # como fechada, com uma transições da última chave para a primeira chave. Se os keyValues
         # na primeira e na última chave não forem idênticos, o campo closed será ignorado.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("SplinePositionInterpolator : set_fraction = {0}".format(set_fraction))
-        print("SplinePositionInterpolator : key = {0}".format(key)) # imprime no terminal
-        print("SplinePositionInterpolator : keyValue = {0}".format(keyValue))
-        print("SplinePositionInterpolator : closed = {0}".format(closed))
-
-        # Abaixo está só um exemplo de como os dados podem ser calculados e transferidos
-        value_changed = [0.0, 0.0, 0.0]
-        
-        return value_changed
+        # Chaves ordenadas e tangentes são calculadas uma vez por nó (parâmetro interpolator)
+        if interpolator is None:
+            interpolator = interpoladores.Spline(key, keyValue, closed)
+        return interpolator.value(set_fraction)
 
     @staticmethod
-    def orientationInterpolator(set_fraction, key, keyValue):
+    def orientationInterpolator(set_fraction, key, keyValue, interpolator=None):
         """Interpola entre uma lista de valores de rotação especificos."""
         # https://www.web3d.org/specifications/X3Dv4/ISO-IEC19775-1v4-IS/Part01/components/interpolators.html#OrientationInterpolator
         # Interpola rotações são absolutas no espaço do objeto e, portanto, não são cumulativas.
@@ -464,15 +659,10 @@ class GL:
         # zeroa a um. O campo keyValue deve conter exatamente tantas rotações 3D quanto os
         # quadros-chave no key.
 
-        # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
-        print("OrientationInterpolator : set_fraction = {0}".format(set_fraction))
-        print("OrientationInterpolator : key = {0}".format(key)) # imprime no terminal
-        print("OrientationInterpolator : keyValue = {0}".format(keyValue))
-
-        # Abaixo está só um exemplo de como os dados podem ser calculados e transferidos
-        value_changed = [0, 0, 1, 0]
-
-        return value_changed
+        # Chaves ordenadas e quatérnios são calculados uma vez por nó (parâmetro interpolator)
+        if interpolator is None:
+            interpolator = interpoladores.Orientation(key, keyValue)
+        return interpolator.value(set_fraction)
 
     # Para o futuro (Não para versão atual do projeto.)
     def vertex_shader(self, shader):
@@ -10,6 +10,10 @@ Data: 31 de Agosto de 2020
 """
 
 import os           # Para rotinas do sistema operacional
+import json         # Cabeçalho do arquivo de texturas decodificadas
+import time         # Para espaçar a verificação de texturas alteradas no disco
+from collections import OrderedDict  # Para a ordem de uso das texturas no cache
+from multiprocessing import shared_memory  # Para Framebuffers compartilhados entre processos
 
 # Numpy
 import numpy as np
@@ -24,6 +28,225 @@ class FrameBuffer:
         """Iniciando propriedades do FramBuffer."""
         self.color = np.empty(0)
         self.depth = np.empty(0)
+        self.shared = {}  # blocos de memória compartilhada de cada canal (se houver)
+
+    def storage(self, attachment, shape, dtype, value, shared=False):
+        """Aloca a memória de um canal, opcionalmente em memória compartilhada."""
+        self.release(attachment)
+        if shared:
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            block = shared_memory.SharedMemory(create=True, size=size)
+            buffer = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            buffer[:] = value
+            self.shared[attachment] = block
+        else:
+            buffer = np.full(shape, value, dtype=dtype)
+        if attachment == GPU.COLOR_ATTACHMENT:
+            self.color = buffer
+        else:
+            self.depth = buffer
+
+    def descriptor(self):
+        """Retorna o necessário para outro processo acessar os canais compartilhados."""
+        channels = {GPU.COLOR_ATTACHMENT: self.color, GPU.DEPTH_ATTACHMENT: self.depth}
+        return {attachment: (block.name, channels[attachment].shape, channels[attachment].dtype.str)
+                for attachment, block in self.shared.items()}
+
+    @staticmethod
+    def attach(descriptor):
+        """Cria um FrameBuffer que usa os canais compartilhados por outro processo."""
+        fbo = FrameBuffer()
+        for attachment, (name, shape, dtype) in descriptor.items():
+            block = shared_memory.SharedMemory(name=name)
+            buffer = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            fbo.shared[attachment] = block
+            if attachment == GPU.COLOR_ATTACHMENT:
+                fbo.color = buffer
+            else:
+                fbo.depth = buffer
+        return fbo
+
+    def release(self, attachment=None, unlink=True):
+        """Libera a memória compartilhada de um canal (ou de todos)."""
+        attachments = list(self.shared) if attachment is None else [attachment]
+        for key in attachments:
+            block = self.shared.pop(key, None)
+            if block is None:
+                continue
+            if key == GPU.COLOR_ATTACHMENT:
+                self.color = np.empty(0)
+            else:
+                self.depth = np.empty(0)
+            block.close()
+            if unlink:
+                block.unlink()
+
+
+def mipmaps(image):
+    """Pirâmide de mipmaps: a imagem e suas reduções pela metade até 1x1 (filtro caixa)."""
+    levels = [image]
+    level = image.astype(np.float32)
+    while max(level.shape[:2]) > 1:
+        # Dimensões ímpares repetem a última linha ou coluna antes de tirar a média 2x2
+        rows, columns = level.shape[:2]
+        if rows % 2 and rows > 1:
+            level = np.concatenate((level, level[-1:]), axis=0)
+        if columns % 2 and columns > 1:
+            level = np.concatenate((level, level[:, -1:]), axis=1)
+        rows, columns = max(level.shape[0] // 2, 1), max(level.shape[1] // 2, 1)
+        level = level.reshape(rows, level.shape[0] // rows, columns, level.shape[1] // columns,
+                              *level.shape[2:]).mean(axis=(1, 3))
+        levels.append(np.rint(level).astype(image.dtype))
+    return levels
+
+
+class Texture:
+    """Textura decodificada com sua pirâmide de mipmaps (somente leitura)."""
+
+    def __init__(self, path, mtime, levels):
+        """Guarda os níveis já calculados, do original (nível 0) ao de 1x1."""
+        self.path = path
+        self.mtime = mtime
+        self.levels = levels
+        for level in levels:
+            level.setflags(write=False)
+        self.nbytes = sum(level.nbytes for level in levels)
+
+    @property
+    def image(self):
+        """Imagem original (nível 0)."""
+        return self.levels[0]
+
+
+class TextureCache:
+    """Cache LRU de texturas decodificadas, chaveado pelo caminho e data de modificação."""
+
+    # Arquivo de texturas decodificadas (.texc)
+    # O arquivo começa com STORE_MAGIC e o tamanho de um cabeçalho JSON com a versão do
+    # formato, a data de modificação e o tamanho da imagem de origem e o tipo, o formato
+    # e a posição de cada nível dos mipmaps. Os níveis são gravados crus e alinhados, e
+    # são lidos por um mapa de memória: vários processos compartilham as mesmas páginas
+    # e só as partes da textura efetivamente amostradas são lidas do disco.
+
+    STORE_MAGIC = b"TEXC"
+    STORE_VERSION = 1
+    STORE_ALIGN = 64
+
+    def __init__(self, capacity=256 * 2**20, recheck=1.0, store=False):
+        """Cria o cache vazio, limitado a capacity bytes."""
+        # O arquivo só é verificado no disco (os.stat) a cada recheck segundos, entre
+        # as verificações a textura já carregada é usada sem nenhum acesso ao disco.
+        # Com store as texturas decodificadas são gravadas num arquivo .texc ao lado da
+        # imagem e, nas próximas leituras, mapeadas em memória em vez de decodificadas.
+        self.capacity = capacity
+        self.recheck = recheck
+        self.store = store
+        self.entries = OrderedDict()  # (caminho, mtime) -> Texture, do menos ao mais usado
+        self.checked = {}  # caminho -> (instante da última verificação, mtime)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        """Textura do arquivo, decodificando só se não estiver no cache ou tiver mudado."""
+        path = os.path.abspath(path)
+        now = time.monotonic()
+        checked, mtime = self.checked.get(path, (None, None))
+        if checked is None or now - checked >= self.recheck:
+            mtime = os.stat(path).st_mtime_ns
+            self.checked[path] = (now, mtime)
+
+        key = (path, mtime)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+
+        # Descarta versões antigas do mesmo arquivo antes de decodificar a nova
+        for old in [old for old in self.entries if old[0] == path]:
+            self.size -= self.entries.pop(old).nbytes
+        levels = self.load_store(path, mtime) if self.store else None
+        if levels is None:
+            image = Image.open(path)
+            if image.mode == "P":  # índices de paleta não podem ser filtrados nos mipmaps
+                image = image.convert("RGBA")
+            image = np.array(image.transpose(Image.TRANSPOSE))
+            levels = mipmaps(image)
+            if self.store and self.save_store(path, mtime, levels):
+                # Troca os níveis decodificados pelos mapeados, liberando a memória
+                levels = self.load_store(path, mtime) or levels
+        texture = Texture(path, mtime, levels)
+        self.entries[key] = texture
+        self.size += texture.nbytes
+
+        # Descarta as texturas usadas há mais tempo (mantendo sempre a mais recente)
+        while self.size > self.capacity and len(self.entries) > 1:
+            _, removed = self.entries.popitem(last=False)
+            self.size -= removed.nbytes
+        return texture
+
+    @staticmethod
+    def store_file(path):
+        """Nome do arquivo de texturas decodificadas ao lado da imagem."""
+        return path + ".texc"
+
+    def load_store(self, path, mtime):
+        """Níveis mapeados em memória (somente leitura), ou None se o arquivo for inválido."""
+        try:
+            with open(self.store_file(path), "rb") as store:
+                if store.read(len(self.STORE_MAGIC)) != self.STORE_MAGIC:
+                    return None
+                size = int.from_bytes(store.read(4), "little")
+                header = json.loads(store.read(size))
+            if (header["version"] != self.STORE_VERSION or header["mtime"] != mtime or
+                    header["size"] != os.path.getsize(path)):
+                return None
+            data = np.memmap(self.store_file(path), dtype=np.uint8, mode="r")
+            return [data[offset:offset + np.prod(shape, dtype=np.int64) * np.dtype(dtype).itemsize]
+                    .view(dtype).reshape(shape) for offset, dtype, shape in header["levels"]]
+        except Exception:  # pylint: disable=broad-except
+            return None  # arquivo ausente, corrompido ou incompatível: decodifica a imagem
+
+    def save_store(self, path, mtime, levels):
+        """Grava os níveis decodificados no arquivo (retorna False se não conseguir)."""
+        def align(position):
+            return -(-position // self.STORE_ALIGN) * self.STORE_ALIGN
+        header = {"version": self.STORE_VERSION, "mtime": mtime, "size": os.path.getsize(path),
+                  "levels": []}
+        while True:  # o tamanho do cabeçalho depende das posições, e vice-versa
+            position = len(self.STORE_MAGIC) + 4 + len(json.dumps(header).encode())
+            placed = []
+            for level in levels:
+                position = align(position)
+                placed.append([position, level.dtype.str, list(level.shape)])
+                position += level.nbytes
+            if placed == header["levels"]:
+                break
+            header["levels"] = placed
+
+        # Grava num arquivo temporário e troca no final, para que um processo lendo o
+        # arquivo ao mesmo tempo nunca encontre uma textura pela metade
+        encoded = json.dumps(header).encode()
+        temporary = f"{self.store_file(path)}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as store:
+                store.write(self.STORE_MAGIC + len(encoded).to_bytes(4, "little") + encoded)
+                for (offset, _, _), level in zip(header["levels"], levels):
+                    store.write(b"\0" * (offset - store.tell()))
+                    store.write(np.ascontiguousarray(level).data)
+            os.replace(temporary, self.store_file(path))
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return False
+        return True
+
+    def clear(self):
+        """Esvazia o cache."""
+        self.entries.clear()
+        self.checked.clear()
+        self.size = 0
 
 
 class GPU:
@@ -46,6 +269,7 @@ class GPU:
     image_file = None
     frame_buffer = None
     path = "."
+    textures = TextureCache()  # texturas já decodificadas, compartilhadas entre as cenas
 
     def __init__(self, image_file, path):
         """Define o nome do arquivo para caso se salvar o framebuffer."""
@@ -87,8 +311,10 @@ class GPU:
             GPU.read_framebuffer = position
 
     @staticmethod
-    def framebuffer_storage(position, attachment, mode, width, height):
+    def framebuffer_storage(position, attachment, mode, width, height, shared=False):
         """Aloca o FrameBuffer especificado."""
+        # Com shared=True a memória é alocada em um bloco compartilhado entre processos,
+        # permitindo que processos auxiliares escrevam diretamente no FrameBuffer.
         if attachment == GPU.COLOR_ATTACHMENT:
             if mode == GPU.RGB8:
                 dtype = np.uint8
@@ -97,7 +323,7 @@ class GPU:
                 dtype = np.uint8
                 depth = 4
             # Aloca espaço definindo todos os valores como 0 (imagem preta)
-            GPU.frame_buffer[position].color = np.zeros((height, width, depth), dtype=dtype)
+            GPU.frame_buffer[position].storage(attachment, (height, width, depth), dtype, 0, shared)
         elif attachment == GPU.DEPTH_ATTACHMENT:
             if mode == GPU.DEPTH_COMPONENT16:
                 dtype = np.uint16
@@ -106,7 +332,7 @@ class GPU:
                 dtype = np.float32
                 depth = 1
             # Aloca espaço definindo todos os valores como 1 (profundidade máxima)
-            GPU.frame_buffer[position].depth = np.ones((height, width, depth), dtype=dtype)
+            GPU.frame_buffer[position].storage(attachment, (height, width, depth), dtype, 1, shared)
 
     @staticmethod
     def clear_color(color):
@@ -130,52 +356,132 @@ class GPU:
     def draw_pixel(coord, mode, data):
         """Define o valor do pixel no framebuffer."""
         if coord and np.any(data):
-            if mode in (GPU.RGB8, GPU.RGBA8):  # cores
-
-                #  Verifica se o Framebuffer do canal de cor foi alocado
-                if GPU.frame_buffer[GPU.draw_framebuffer].color.size != 0:
-
-                    # Coleta a dimensão do Framebuffer para o canal de cor
-                    fb_dim = GPU.frame_buffer[GPU.draw_framebuffer].color.shape
-
-                    # Verifica se escrita é em um local válido
-                    if coord[0] < 0 or coord[0] >= fb_dim[1] or coord[1] < 0 or coord[1] >= fb_dim[0]:
-                        raise Exception(f"Acesso irregular de escrita na posição [{coord[0]}, {coord[1]}] do Framebuffer {fb_dim[1], fb_dim[0]}")
-
-                    # Verifica se os dados estão no tamanho certo e em uma faixa suportada
-                    if isinstance(data, (list, tuple, np.ndarray)) and (len(data) == (mode+2)) and all( 0 <= i <= 255 for i in data):
-                        # Grava dados no Framebuffer
-                        GPU.frame_buffer[GPU.draw_framebuffer].color[coord[1]][coord[0]] = data
-                    else:
-                        raise Exception(f"Valores do Frame buffer devem estar em um vetor de dimensão [{mode+2}] ser inteiros e estar entre 0 e 255")
-                else:
-                    raise Exception(f"Frame buffer {GPU.draw_framebuffer} não alocado com o canal de cor")
+            # Verifica se os dados estão em um formato suportado antes de criar os vetores
+            if not isinstance(data, (list, tuple, np.ndarray)):
+                if mode in (GPU.RGB8, GPU.RGBA8):
+                    raise Exception(f"Valores do Frame buffer devem estar em um vetor de dimensão [{mode+2}] ser inteiros e estar entre 0 e 255")
+                raise Exception(f"Valores do Frame buffer devem ser um vetor com um único valor numérico: {data}")
 
-            elif mode in (GPU.DEPTH_COMPONENT16, GPU.DEPTH_COMPONENT32F):  # profundidade
+            # Um único pixel é só um lote de tamanho um
+            GPU.draw_pixels([coord[0]], [coord[1]], mode, [data])
 
-                #  Verifica se o Framebuffer do canal de profundidade foi alocado
-                if GPU.frame_buffer[GPU.draw_framebuffer].depth.size != 0:
+    @staticmethod
+    def draw_pixels(x, y, mode, data):
+        """Define os valores de um lote de pixels no framebuffer."""
+        # Os parâmetros x e y são vetores com as coordenadas de cada pixel, já data
+        # possui uma linha por pixel com os valores a serem gravados. Caso data possua
+        # uma única linha, esse valor é usado para todos os pixels do lote.
+        x = np.asarray(x)
+        y = np.asarray(y)
+        data = np.asarray(data)
+
+        if x.shape != y.shape or x.ndim != 1:
+            raise Exception(f"Coordenadas x e y devem ser vetores de mesmo tamanho: {x.shape} e {y.shape}")
+        if x.size == 0:
+            return
+        if not (np.issubdtype(x.dtype, np.integer) and np.issubdtype(y.dtype, np.integer)):
+            raise Exception("Coordenadas do Frame buffer devem ser valores inteiros")
+
+        if mode in (GPU.RGB8, GPU.RGBA8):  # cores
+            buffer = GPU.frame_buffer[GPU.draw_framebuffer].color
+            channels = mode+2
+
+            #  Verifica se o Framebuffer do canal de cor foi alocado
+            if buffer.size == 0:
+                raise Exception(f"Frame buffer {GPU.draw_framebuffer} não alocado com o canal de cor")
+
+            # Verifica se os dados estão no tamanho certo e em uma faixa suportada
+            if data.ndim == 1:
+                data = data[np.newaxis]
+            if (data.ndim != 2 or data.shape[1] != channels or data.shape[0] not in (1, x.size) or
+                    not np.issubdtype(data.dtype, np.number) or
+                    data.min() < 0 or data.max() > 255):
+                raise Exception(f"Valores do Frame buffer devem estar em um vetor de dimensão [{channels}] ser inteiros e estar entre 0 e 255")
+
+        elif mode in (GPU.DEPTH_COMPONENT16, GPU.DEPTH_COMPONENT32F):  # profundidade
+            buffer = GPU.frame_buffer[GPU.draw_framebuffer].depth
+
+            #  Verifica se o Framebuffer do canal de profundidade foi alocado
+            if buffer.size == 0:
+                raise Exception(f"Frame buffer {GPU.draw_framebuffer} não alocado com o canal de profundidade")
+
+            # Verifica se os dados estão no tamanho certo e em um formato suportado
+            data = data.reshape(-1, 1) if data.ndim <= 1 else data
+            if (data.ndim != 2 or data.shape[1] != 1 or data.shape[0] not in (1, x.size) or
+                    not np.issubdtype(data.dtype, np.number)):
+                raise Exception(f"Valores do Frame buffer devem ser um vetor com um único valor numérico: {data}")
 
-                    # Coleta a dimensão do Framebuffer para o canal de profundidade
-                    fb_dim = GPU.frame_buffer[GPU.draw_framebuffer].depth.shape
+        else:
+            raise Exception(f"Modo inválido de escrita do Frame buffer ({mode})")
 
-                    # Verifica se escrita é em um local válido
-                    if coord[0] < 0 or coord[0] >= fb_dim[1] or coord[1] < 0 or coord[1] >= fb_dim[0]:
-                        raise Exception(f"Acesso irregular de escrita na posição [{coord[0]}, {coord[1]}] do Framebuffer {fb_dim[1], fb_dim[0]}")
-
-                    # Verifica se os dados estão no tamanho certo e em um formato suportado
-                    if isinstance(data, (list, tuple, np.ndarray)) and (len(data)==1) and isinstance(data[0], (int, float)):
-                        # Grava dados no Framebuffer
-                        GPU.frame_buffer[GPU.draw_framebuffer].depth[coord[1]][coord[0]] = data
-                    else:
-                        raise Exception(f"Valores do Frame buffer devem ser um vetor com um único valor numérico: {data}")
-                    
-                else:
-                    raise Exception(f"Frame buffer {GPU.draw_framebuffer} não alocado com o canal de profundidade")
+        # Verifica se todas as escritas são em locais válidos (uma única vez para o lote)
+        fb_dim = buffer.shape
+        invalid = (x < 0) | (x >= fb_dim[1]) | (y < 0) | (y >= fb_dim[0])
+        if np.any(invalid):
+            pos = np.argmax(invalid)
+            raise Exception(f"Acesso irregular de escrita na posição [{x[pos]}, {y[pos]}] do Framebuffer {fb_dim[1], fb_dim[0]}")
 
-            else:
-                raise Exception(f"Modo inválido de leitura do Frame buffer ({mode})")
+        # Grava dados no Framebuffer de uma só vez (fancy indexing)
+        buffer[y, x] = data
 
+    @staticmethod
+    def draw_fragments(x, y, z, data, mode=RGB8):
+        """Grava um lote de fragmentos com teste de profundidade no framebuffer."""
+        # Cada fragmento possui uma posição (x, y), uma profundidade z e uma cor em data.
+        # Um fragmento só é gravado se estiver mais próximo (menor z) que o valor já
+        # presente no canal de profundidade. Caso o lote possua vários fragmentos para
+        # um mesmo pixel, somente o mais próximo deles é considerado.
+        x = np.asarray(x)
+        y = np.asarray(y)
+        z = np.asarray(z, dtype=np.float64).reshape(-1)
+        data = np.asarray(data)
+
+        if x.shape != y.shape or x.ndim != 1 or z.size != x.size:
+            raise Exception(f"Coordenadas x, y e z devem ser vetores de mesmo tamanho: {x.shape}, {y.shape} e {z.shape}")
+        if x.size == 0:
+            return
+        if not (np.issubdtype(x.dtype, np.integer) and np.issubdtype(y.dtype, np.integer)):
+            raise Exception("Coordenadas do Frame buffer devem ser valores inteiros")
+        if data.ndim == 1:
+            data = np.broadcast_to(data, (x.size, data.size))
+        if len(data) != x.size:
+            raise Exception(f"Valores dos fragmentos devem ter uma linha por fragmento: {len(data)} linhas para {x.size} fragmentos")
+
+        framebuffer = GPU.frame_buffer[GPU.draw_framebuffer]
+
+        #  Verifica se o Framebuffer do canal de profundidade foi alocado
+        if framebuffer.depth.size == 0:
+            raise Exception(f"Frame buffer {GPU.draw_framebuffer} não alocado com o canal de profundidade")
+
+        # O z dos fragmentos é comparado diretamente, sem conversão para inteiros de 16bits
+        if not np.issubdtype(framebuffer.depth.dtype, np.floating):
+            raise Exception(f"Frame buffer {GPU.draw_framebuffer} precisa do canal de profundidade em float (DEPTH_COMPONENT32F) para o teste de profundidade")
+
+        # Verifica se todas as escritas são em locais válidos
+        fb_dim = framebuffer.depth.shape
+        invalid = (x < 0) | (x >= fb_dim[1]) | (y < 0) | (y >= fb_dim[0])
+        if np.any(invalid):
+            pos = np.argmax(invalid)
+            raise Exception(f"Acesso irregular de escrita na posição [{x[pos]}, {y[pos]}] do Framebuffer {fb_dim[1], fb_dim[0]}")
+
+        # Resolve pixels repetidos no lote mantendo só o fragmento mais próximo
+        pixel = y.astype(np.int64) * fb_dim[1] + x
+        order = np.lexsort((z, pixel))
+        pixel = pixel[order]
+        first = np.ones(pixel.size, dtype=bool)
+        first[1:] = pixel[1:] != pixel[:-1]
+        order = order[first]
+
+        # Teste de profundidade contra o valor já presente no Framebuffer
+        x, y, z = x[order], y[order], z[order]
+        passed = z < framebuffer.depth[y, x, 0]
+        if not np.any(passed):
+            return
+        x, y = x[passed], y[passed]
+
+        # Grava cores e profundidades dos fragmentos aprovados
+        GPU.draw_pixels(x, y, mode, data[order][passed])
+        framebuffer.depth[y, x, 0] = z[passed]
 
     @staticmethod
     def read_pixel(coord, mode):
@@ -222,12 +528,44 @@ class GPU:
             return data
 
     @staticmethod
-    def save_image():
+    def read_pixels(x, y, mode):
+        """Retorna os valores de um lote de pixels no framebuffer."""
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if mode in (GPU.RGB8, GPU.RGBA8):  # cores
+            buffer = GPU.frame_buffer[GPU.read_framebuffer].color
+            if buffer.size == 0:
+                raise Exception(f"Frame buffer {GPU.read_framebuffer} não alocado com o canal de cor")
+        elif mode in (GPU.DEPTH_COMPONENT16, GPU.DEPTH_COMPONENT32F):  # profundidade
+            buffer = GPU.frame_buffer[GPU.read_framebuffer].depth
+            if buffer.size == 0:
+                raise Exception(f"Frame buffer {GPU.read_framebuffer} não alocado com o canal de profundidade")
+        else:
+            raise Exception(f"Modo inválido de leitura do Frame buffer ({mode})")
+
+        # Verifica se todas as leituras são em locais válidos
+        fb_dim = buffer.shape
+        invalid = (x < 0) | (x >= fb_dim[1]) | (y < 0) | (y >= fb_dim[0])
+        if np.any(invalid):
+            pos = np.argmax(invalid)
+            raise Exception(f"Acesso irregular de leitura na posição [{x[pos]}, {y[pos]}] do Framebuffer {fb_dim[1], fb_dim[0]}")
+
+        return buffer[y, x]
+
+    @staticmethod
+    def save_image(filename=None, color=None):
         """Método para salvar a imagem do framebuffer em um arquivo."""
-        if GPU.frame_buffer[GPU.read_framebuffer].color.shape[2] == 3:
-            img = Image.fromarray(GPU.frame_buffer[GPU.read_framebuffer].color, 'RGB')
+        # Com color informado é salva essa imagem (por exemplo um quadro já entregue
+        # pelo pipeline) em vez do FrameBuffer de leitura atual
+        if color is None:
+            color = GPU.frame_buffer[GPU.read_framebuffer].color
+        if color.shape[2] == 3:
+            img = Image.fromarray(color, 'RGB')
         else:
-            img = Image.fromarray(GPU.frame_buffer[GPU.read_framebuffer].color, 'RGBA')
+            img = Image.fromarray(color, 'RGBA')
+        if filename:  # nome exato informado, sem numeração
+            img.save(filename)
+            return
         counter = 0
         filename = GPU.image_file.split('.')
         while os.path.exists(filename[0]+str(counter).zfill(3)+'.'+filename[1]):
@@ -237,10 +575,13 @@ class GPU:
     @staticmethod
     def load_texture(textura):
         """Método para ler textura."""
-        file = os.path.join(GPU.path, textura)
-        imagem = Image.open(file).transpose(Image.TRANSPOSE)
-        matriz = np.array(imagem)
-        return matriz
+        # A imagem é decodificada uma única vez e depois vem do cache (somente leitura)
+        return GPU.texture(textura).image
+
+    @staticmethod
+    def texture(textura):
+        """Textura com a pirâmide de mipmaps, via cache."""
+        return GPU.textures.get(os.path.join(GPU.path, textura))
 
     @staticmethod
     def get_frame_buffer():
@@ -249,4 +590,8 @@ class GPU:
 
     @staticmethod
     def swap_buffers():
-        """Método para a troca dos buffers (NÃO IMPLEMENTADA)."""
+        """Troca os FrameBuffers de desenho (back) e de leitura (front)."""
+        # Só os índices são trocados, nenhum pixel é copiado. O quadro recém desenhado
+        # passa a ser o de leitura (exibido ou salvo) enquanto o próximo quadro é
+        # desenhado no outro FrameBuffer. Com um único FrameBuffer nada muda.
+        GPU.draw_framebuffer, GPU.read_framebuffer = GPU.read_framebuffer, GPU.draw_framebuffer
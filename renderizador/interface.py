@@ -164,8 +164,10 @@ class Interface:
             print("Salvando imagem")
             self.image_saver()
 
-    def preview(self, pause, func):
+    def preview(self, pause, func, fps=None):
         """Realização a visualização na tela da interface gráfica."""
+        # Com fps informado os quadros vêm de uma thread de renderização: func retorna
+        # None quando não há quadro novo e fps() mede só o tempo de renderização.
         extent = (0, self.width, self.height, 0)
 
         # Coleta o tempo antes da renderização
@@ -208,12 +210,16 @@ class Interface:
             data = func()
 
             # Atualiza a imagem renderizada
-            image.set_array(data)
+            if data is not None:
+                image.set_array(data)
 
             # Calcula e atualiza a quantidade de Quadros Por Segundo
-            fps = "{:.1f}".format(1/(time.process_time() - Interface.last_time))
-            time_box.set_val(fps)
-            time_box.cursor_index = len(fps)
+            if fps:
+                rate = "{:.1f}".format(fps())
+            else:
+                rate = "{:.1f}".format(1/(time.process_time() - Interface.last_time))
+            time_box.set_val(rate)
+            time_box.cursor_index = len(rate)
             Interface.last_time = time.process_time()
 
             return image, time_box
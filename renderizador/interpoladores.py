@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Interpoladores de Quadros-Chave (SplinePositionInterpolator e OrientationInterpolator).
+
+Desenvolvido por: Luciano Soares <lpsoares@insper.edu.br>
+Disciplina: Computação Gráfica
+Data: 18 de Outubro de 2026
+"""
+
+import abc          # Classe base abstrata dos interpoladores
+
+import numpy as np  # Biblioteca do Numpy
+
+
+def keyframes(key, keyValue, size, name):
+    """Chaves (K,) e valores (K, size) ordenados pelas chaves."""
+    keys = np.asarray(key, dtype=np.float64).reshape(-1)
+    values = np.asarray(keyValue if keyValue is not None else [], dtype=np.float64)
+    if values.size != keys.size * size:
+        raise Exception(f"{name}: keyValue deve ter {size} valores para cada uma das {keys.size} chaves, recebeu {values.size}")
+    if keys.size == 0:
+        raise Exception(f"{name}: key não pode ser vazio")
+    order = np.argsort(keys, kind="stable")  # chaves fora de ordem são reordenadas
+    return keys[order], values.reshape(-1, size)[order]
+
+def segments(keys, fractions):
+    """Índice do segmento [k_i, k_i+1] e posição s (0 a 1) de cada fração nele."""
+    # A busca binária encontra todos os segmentos de uma vez; frações fora do intervalo
+    # das chaves ficam presas no primeiro ou no último quadro-chave
+    fractions = np.clip(fractions, keys[0], keys[-1])
+    index = np.clip(np.searchsorted(keys, fractions, side="right") - 1, 0, len(keys) - 2)
+    length = keys[index + 1] - keys[index]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        s = np.where(length > 0, (fractions - keys[index]) / length, 1.0)
+    return index, np.clip(s, 0, 1)
+
+
+class Interpolator(abc.ABC):
+    """Base dos interpoladores: avalia uma fração ou um vetor de frações de uma vez."""
+
+    size = 1  # valores por quadro-chave
+
+    @abc.abstractmethod
+    def values(self, fractions):
+        """Valores (N, size) interpolados para um vetor de N frações."""
+
+    def value(self, fraction):
+        """Valor interpolado (lista) para uma única fração."""
+        return self.values(np.array([fraction], dtype=np.float64))[0].tolist()
+
+
+class Spline(Interpolator):
+    """Spline de Catmull-Rom (Hermite) por vetores 3D, com as tangentes pré-calculadas."""
+
+    size = 3
+
+    def __init__(self, key, keyValue, closed=False):
+        """Ordena os quadros-chave e calcula as tangentes de cada um."""
+        # https://www.web3d.org/specifications/X3Dv4/ISO-IEC19775-1v4-IS/Part01/components/interpolators.html#SplinePositionInterpolator
+        self.keys, self.points = keyframes(key, keyValue, 3, "SplinePositionInterpolator")
+        count = len(self.keys)
+
+        # O closed só vale se o primeiro e o último valores forem iguais
+        self.closed = bool(closed) and count > 2 and np.array_equal(self.points[0], self.points[-1])
+
+        # Tangente de Catmull-Rom T_i = (v_i+1 - v_i-1) / 2, ajustada pelo espaçamento
+        # das chaves para ser contínua mesmo com quadros-chave em intervalos diferentes
+        tangents = np.zeros_like(self.points)
+        outgoing = np.zeros(count)  # escala da tangente no segmento que começa em i
+        incoming = np.zeros(count)  # escala da tangente no segmento que termina em i
+        if count > 2:
+            tangents[1:-1] = (self.points[2:] - self.points[:-2]) / 2
+            span = self.keys[2:] - self.keys[:-2]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                outgoing[1:-1] = np.where(span > 0, 2 * (self.keys[2:] - self.keys[1:-1]) / span, 0)
+                incoming[1:-1] = np.where(span > 0, 2 * (self.keys[1:-1] - self.keys[:-2]) / span, 0)
+            if self.closed:
+                # Nas pontas fechadas os vizinhos são o penúltimo e o segundo quadros-chave
+                tangents[0] = tangents[-1] = (self.points[1] - self.points[-2]) / 2
+                first = self.keys[1] - self.keys[0]
+                last = self.keys[-1] - self.keys[-2]
+                if first + last > 0:
+                    outgoing[0] = 2 * first / (first + last)
+                    incoming[-1] = 2 * last / (first + last)
+        # Sem closed as tangentes das pontas são nulas
+        self.start_tangents = tangents * outgoing[:, np.newaxis]  # T0_i
+        self.end_tangents = tangents * incoming[:, np.newaxis]    # T1_i
+
+    def values(self, fractions):
+        """Posições (N, 3) interpoladas para um vetor de N frações."""
+        fractions = np.asarray(fractions, dtype=np.float64).reshape(-1)
+        if len(self.keys) == 1:
+            return np.repeat(self.points, len(fractions), axis=0)
+        index, s = segments(self.keys, fractions)
+
+        # Funções de base de Hermite aplicadas a v_i, v_i+1, T0_i e T1_i+1
+        s2 = s * s
+        s3 = s2 * s
+        basis = np.stack((2*s3 - 3*s2 + 1, -2*s3 + 3*s2, s3 - 2*s2 + s, s3 - s2), axis=1)
+        return (basis[:, 0:1] * self.points[index] + basis[:, 1:2] * self.points[index + 1] +
+                basis[:, 2:3] * self.start_tangents[index] +
+                basis[:, 3:4] * self.end_tangents[index + 1])
+
+
+class Orientation(Interpolator):
+    """Interpolação esférica (slerp) entre rotações, com os quatérnios pré-calculados."""
+
+    size = 4
+
+    def __init__(self, key, keyValue):
+        """Ordena os quadros-chave e converte as rotações em quatérnios unitários."""
+        # https://www.web3d.org/specifications/X3Dv4/ISO-IEC19775-1v4-IS/Part01/components/interpolators.html#OrientationInterpolator
+        self.keys, rotations = keyframes(key, keyValue, 4, "OrientationInterpolator")
+
+        # Quatérnios (x, y, z, w); eixos nulos viram a rotação identidade
+        axis = rotations[:, :3]
+        norm = np.linalg.norm(axis, axis=1, keepdims=True)
+        axis = np.where(norm > 0, axis / np.where(norm > 0, norm, 1), [0, 0, 1])
+        half = rotations[:, 3:4] / 2
+        self.quaternions = np.hstack((axis * np.sin(half), np.cos(half)))
+
+        # Em cada segmento o segundo quatérnio é trocado de sinal se preciso para seguir
+        # o caminho mais curto, e o ângulo entre os dois já fica calculado
+        start = self.quaternions[:-1]
+        end = self.quaternions[1:]
+        dot = np.sum(start * end, axis=1)
+        self.ends = np.where(dot[:, np.newaxis] < 0, -end, end)
+        self.angles = np.arccos(np.clip(np.abs(dot), 0, 1))
+
+    def values(self, fractions):
+        """Rotações (N, 4) no formato [x, y, z, ângulo] para um vetor de N frações."""
+        fractions = np.asarray(fractions, dtype=np.float64).reshape(-1)
+        if len(self.keys) == 1:
+            quaternions = np.repeat(self.quaternions, len(fractions), axis=0)
+        else:
+            index, s = segments(self.keys, fractions)
+            angle = self.angles[index]
+            sine = np.sin(angle)
+
+            # Perto de ângulo zero o slerp vira interpolação linear (evita dividir por zero)
+            small = sine < 1e-6
+            safe = np.where(small, 1, sine)
+            first = np.where(small, 1 - s, np.sin((1 - s) * angle) / safe)
+            second = np.where(small, s, np.sin(s * angle) / safe)
+            quaternions = (first[:, np.newaxis] * self.quaternions[index] +
+                           second[:, np.newaxis] * self.ends[index])
+            quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+
+        # Volta para eixo e ângulo (o eixo padrão é usado quando não há rotação)
+        sine = np.linalg.norm(quaternions[:, :3], axis=1)
+        angle = 2 * np.arctan2(sine, quaternions[:, 3])
+        axis = np.where(sine[:, np.newaxis] > 1e-12,
+                        quaternions[:, :3] / np.where(sine > 1e-12, sine, 1)[:, np.newaxis],
+                        [0, 0, 1])
+        return np.hstack((axis, angle[:, np.newaxis]))
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Pipeline de Quadros: renderização numa thread separada da exibição ou gravação.
+
+Desenvolvido por: Luciano Soares <lpsoares@insper.edu.br>
+Disciplina: Computação Gráfica
+Data: 18 de Outubro de 2026
+"""
+
+import time         # Para medir o tempo de renderização de cada quadro
+import queue        # Fila limitada de quadros prontos
+import threading    # Thread de renderização
+import collections  # Janela dos últimos tempos de renderização
+
+import numpy as np  # Biblioteca do Numpy
+from PIL import Image  # Para gravar os quadros como imagens
+
+import gpu          # Simula os recursos de uma GPU
+
+DEPTH = 2    # Quadros prontos que podem aguardar na fila
+WINDOW = 30  # Quadros usados na média do FPS
+
+
+class Pipeline:
+    """Renderiza quadros numa thread produtora e entrega por uma fila limitada."""
+
+    def __init__(self, render, framebuffers):
+        """Recebe a função que renderiza um quadro e as posições do anel de FrameBuffers."""
+        # Cada quadro é desenhado no próximo FrameBuffer do anel. A fila comporta dois
+        # quadros a menos que o anel: um para o quadro sendo desenhado e outro para o
+        # último entregue, que continua em uso (exibido ou gravado) pelo consumidor.
+        if len(framebuffers) < 3:
+            raise Exception(f"Pipeline precisa de pelo menos 3 FrameBuffers, recebeu {len(framebuffers)}")
+        self.render = render
+        self.framebuffers = list(framebuffers)
+        self.queue = queue.Queue(maxsize=len(self.framebuffers) - 2)
+        self.times = collections.deque(maxlen=WINDOW)  # duração (s) dos últimos quadros
+        self.frames = 0      # quadros renderizados
+        self.current = None  # último quadro entregue ao consumidor
+        self.error = None    # exceção ocorrida na thread de renderização
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Inicia a thread de renderização."""
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="renderizacao", daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        """Laço da thread de renderização (produtor)."""
+        try:
+            while not self.stopping.is_set():
+                position = self.framebuffers[self.frames % len(self.framebuffers)]
+                gpu.GPU.bind_framebuffer(gpu.GPU.DRAW_FRAMEBUFFER, position)
+                start = time.perf_counter()
+                frame = self.render()
+                self.times.append(time.perf_counter() - start)
+                self.frames += 1
+
+                # Espera espaço na fila, sem impedir o encerramento
+                while not self.stopping.is_set():
+                    try:
+                        self.queue.put(frame, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as exception:  # pylint: disable=broad-except
+            self.error = exception  # repassada ao consumidor em get()
+
+    def get(self, timeout=None):
+        """Próximo quadro na ordem de renderização (None se não ficar pronto no tempo)."""
+        # Espera em intervalos curtos para repassar um erro da thread de renderização
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            wait = 0.1 if deadline is None else min(0.1, max(deadline - time.perf_counter(), 0))
+            try:
+                self.current = self.queue.get(timeout=wait)
+                return self.current
+            except queue.Empty:
+                if self.error:
+                    raise self.error  # pylint: disable=raise-missing-from
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return None
+
+    def latest(self):
+        """Quadro mais recente já pronto, descartando os antigos (None se não houver novo)."""
+        # Na exibição só interessa o quadro mais novo; o primeiro quadro é aguardado
+        frame = self.get() if self.current is None else None
+        while True:
+            try:
+                frame = self.current = self.queue.get_nowait()
+            except queue.Empty:
+                break
+        if frame is None and self.error:
+            raise self.error
+        return frame
+
+    def save(self):
+        """Salva em arquivo o último quadro entregue ao consumidor (o exibido na janela)."""
+        # O FrameBuffer de leitura da GPU é trocado pela thread de renderização a cada
+        # quadro e pode estar até DEPTH quadros à frente do exibido, então não é usado
+        if self.current is not None:
+            gpu.GPU.save_image(color=self.current)
+
+    def fps(self):
+        """Quadros por segundo considerando só o tempo de renderização."""
+        if not self.times:
+            return 0.0
+        return len(self.times) / sum(self.times)
+
+    def stop(self):
+        """Encerra a thread de renderização."""
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class Writer:
+    """Grava quadros numa thread de fundo, na ordem em que foram renderizados."""
+
+    def __init__(self, write, depth=DEPTH):
+        """Recebe a função write(índice, quadro) que grava um quadro."""
+        # A fila limitada segura o renderizador quando a gravação fica para trás. Quem
+        # envia os quadros deve usar um anel com depth + 2 FrameBuffers, como no Pipeline.
+        self.write = write
+        self.queue = queue.Queue(maxsize=depth)
+        self.frames = 0    # quadros gravados
+        self.error = None  # exceção ocorrida na thread de gravação
+        self.thread = threading.Thread(target=self.run, name="gravacao", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Laço da thread de gravação (consumidor)."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error:
+                continue  # só esvazia a fila, o erro é repassado em put() ou close()
+            try:
+                self.write(*item)
+                self.frames += 1
+            except Exception as exception:  # pylint: disable=broad-except
+                self.error = exception
+
+    def put(self, index, frame):
+        """Envia um quadro para gravação (espera se a fila estiver cheia)."""
+        if self.error:
+            raise self.error
+        self.queue.put((index, frame))
+
+    def close(self):
+        """Espera a gravação dos quadros pendentes e encerra a thread."""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+
+def image_sequence(pattern):
+    """Função de gravação de cada quadro numa imagem com nome pattern % índice."""
+    def write(index, frame):
+        Image.fromarray(frame).save(pattern % index)
+    return write
+
+def raw_stream(stream):
+    """Função de gravação dos pixels (rgb24) de cada quadro num fluxo binário (pipe)."""
+    def write(_index, frame):
+        stream.write(np.ascontiguousarray(frame).data)
+    return write
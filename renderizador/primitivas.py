@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Tesselação das Primitivas Geométricas (Box, Sphere, Cone e Cylinder).
+
+Desenvolvido por: Luciano Soares <lpsoares@insper.edu.br>
+Disciplina: Computação Gráfica
+Data: 18 de Outubro de 2026
+"""
+
+from collections import OrderedDict  # Para a ordem de uso das entradas do cache
+
+import numpy as np  # Biblioteca do Numpy
+
+LEVEL = 24  # Nível de subdivisão padrão (número de fatias ao redor do eixo)
+LEVELS = (6, 8, 12, 16, 24, 32, 48, 64)  # Níveis usados na seleção por tamanho na tela
+EDGE = 4  # Comprimento desejado (em pixels) das arestas ao redor do contorno
+CAPACITY = 64 * 2**20  # Tamanho máximo padrão (em bytes) do cache de tesselações
+
+
+def box(size, level=None):
+    """Paralelepípedo centrado na origem com quatro vértices por face."""
+    # O nível de subdivisão não se aplica à caixa, as faces são sempre dois triângulos
+    half = np.abs(np.asarray(size, dtype=np.float64)) / 2
+    vertices, normals = [], []
+    for axis in range(3):
+        u, v = (axis + 1) % 3, (axis + 2) % 3
+        for side in (-1, 1):
+            normal = np.zeros(3)
+            normal[axis] = side
+            for a, b in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+                corner = np.zeros(3)
+                corner[axis] = side * half[axis]
+                corner[u] = a * half[u]
+                corner[v] = b * side * half[v]  # mantém a face no sentido anti-horário
+                vertices.append(corner)
+                normals.append(normal)
+    quads = np.arange(24).reshape(6, 4)
+    triangles = np.concatenate((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]))
+    return np.array(vertices), np.array(normals), triangles
+
+def sphere(radius, level=LEVEL):
+    """Esfera UV com level fatias ao redor do eixo y e level/2 camadas entre os polos."""
+    slices = max(int(level), 3)
+    stacks = max(slices // 2, 2)
+    theta = np.linspace(0, np.pi, stacks + 1)[:, np.newaxis]  # do polo norte ao sul
+    phi = np.linspace(0, 2 * np.pi, slices + 1)[np.newaxis, :]  # repete a costura
+    normals = np.stack((np.sin(theta) * np.sin(phi),
+                        np.broadcast_to(np.cos(theta), (stacks + 1, slices + 1)),
+                        np.sin(theta) * np.cos(phi)), axis=-1).reshape(-1, 3)
+
+    # Dois triângulos por quadrilátero da grade, sem os triângulos degenerados dos polos
+    row, column = np.meshgrid(np.arange(stacks), np.arange(slices), indexing="ij")
+    a = (row * (slices + 1) + column).reshape(-1)
+    b = a + slices + 1
+    upper = np.stack((a, b, a + 1), axis=1)[row.reshape(-1) > 0]
+    lower = np.stack((a + 1, b, b + 1), axis=1)[row.reshape(-1) < stacks - 1]
+    return normals * radius, normals, np.concatenate((upper, lower))
+
+def ring(radius, y, slices):
+    """Pontos de um círculo de raio radius na altura y (o primeiro é repetido no final)."""
+    phi = np.linspace(0, 2 * np.pi, slices + 1)
+    return np.stack((radius * np.sin(phi), np.full(slices + 1, y), radius * np.cos(phi)), axis=1)
+
+def cap(radius, y, slices, up):
+    """Disco que fecha uma das extremidades do cone ou do cilindro."""
+    vertices = np.vstack((ring(radius, y, slices), [[0, y, 0]]))
+    normals = np.tile([0, 1 if up else -1, 0], (slices + 2, 1)).astype(np.float64)
+    center = slices + 1
+    first = np.arange(slices)
+    triangles = np.stack((np.full(slices, center), first, first + 1), axis=1)
+    if not up:
+        triangles = triangles[:, [0, 2, 1]]
+    return vertices, normals, triangles
+
+def side(bottom, top, height, slices):
+    """Superfície lateral entre o anel de baixo (raio bottom) e o de cima (raio top)."""
+    half = height / 2
+    vertices = np.vstack((ring(bottom, -half, slices), ring(top, half, slices)))
+    slope = (bottom - top) / height if height else 0
+    radial = ring(1, 0, slices)
+    normal = radial + np.array([0, slope, 0])
+    normal /= np.linalg.norm(normal, axis=1)[:, np.newaxis]
+    normals = np.vstack((normal, normal))
+    first = np.arange(slices)
+    a, b = first, first + slices + 1
+    triangles = np.stack((a, a + 1, b + 1), axis=1)
+    if top:  # no cone o anel de cima é um ponto só e o segundo triângulo seria degenerado
+        triangles = np.concatenate((triangles, np.stack((a, b + 1, b), axis=1)))
+    return vertices, normals, triangles
+
+def merge(*parts):
+    """Junta malhas (vértices, normais, triângulos) deslocando os índices."""
+    vertices, normals, triangles = [], [], []
+    offset = 0
+    for part_vertices, part_normals, part_triangles in parts:
+        vertices.append(part_vertices)
+        normals.append(part_normals)
+        triangles.append(part_triangles + offset)
+        offset += len(part_vertices)
+    return np.vstack(vertices), np.vstack(normals), np.concatenate(triangles)
+
+def cone(bottom_radius, height, level=LEVEL):
+    """Cone alinhado com o eixo y, fechado na base."""
+    slices = max(int(level), 3)
+    return merge(side(bottom_radius, 0, height, slices),
+                 cap(bottom_radius, -height / 2, slices, False))
+
+def cylinder(radius, height, level=LEVEL):
+    """Cilindro alinhado com o eixo y, fechado nas duas extremidades."""
+    slices = max(int(level), 3)
+    return merge(side(radius, radius, height, slices),
+                 cap(radius, height / 2, slices, True),
+                 cap(radius, -height / 2, slices, False))
+
+
+def level_for(pixels):
+    """Menor nível de subdivisão com arestas de até EDGE pixels num contorno de raio pixels."""
+    # Os níveis são discretos para que objetos de tamanhos parecidos dividam o cache
+    slices = 2 * np.pi * pixels / EDGE
+    for level in LEVELS:
+        if level >= slices:
+            return level
+    return LEVELS[-1]
+
+
+class Cache:
+    """Cache LRU de tesselações limitado pelo total de bytes dos vetores guardados."""
+
+    def __init__(self, capacity=CAPACITY):
+        """Cria o cache vazio."""
+        self.capacity = capacity
+        self.entries = OrderedDict()  # chave -> (vetores, bytes), do menos ao mais usado
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """Retorna os vetores da chave, gerando com build() se não estiverem no cache."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+        self.misses += 1
+
+        # Os vetores são compartilhados por todos que pedirem a mesma chave
+        arrays = build()
+        for array in arrays:
+            array.setflags(write=False)
+        size = sum(array.nbytes for array in arrays)
+        self.entries[key] = (arrays, size)
+        self.size += size
+
+        # Descarta as entradas usadas há mais tempo (mantendo sempre a mais recente)
+        while self.size > self.capacity and len(self.entries) > 1:
+            _, (_, removed) = self.entries.popitem(last=False)
+            self.size -= removed
+        return arrays
+
+    def clear(self):
+        """Esvazia o cache."""
+        self.entries.clear()
+        self.size = 0
+
+
+cache = Cache()  # Cache compartilhado por todo o processo
+
+GENERATORS = {
+    "box": box,
+    "sphere": sphere,
+    "cone": cone,
+    "cylinder": cylinder,
+}
+
+def tessellate(primitive, *params, level=LEVEL):
+    """Vértices, normais e triângulos (somente leitura) de uma primitiva, via cache."""
+    # Os parâmetros entram na chave como tupla de floats (o size da caixa é uma lista)
+    key_params = tuple(float(value) for param in params
+                       for value in np.atleast_1d(param).reshape(-1))
+    key = (primitive, key_params, None if primitive == "box" else int(level))
+    return cache.get(key, lambda: GENERATORS[primitive](*params, level=level))
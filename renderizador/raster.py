@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Rasterização de Triângulos.
+
+Desenvolvido por: Luciano Soares <lpsoares@insper.edu.br>
+Disciplina: Computação Gráfica
+Data: 18 de Outubro de 2026
+"""
+
+import multiprocessing  # Para o processamento paralelo dos tiles
+
+import numpy as np  # Biblioteca do Numpy
+
+import gpu          # Simula os recursos de uma GPU
+
+TILE = 32  # Tamanho padrão (em pixels) dos tiles da tela
+
+
+def edges(xy):
+    """Coeficientes das funções de aresta E(x, y) = A*x + B*y + C de cada triângulo."""
+    # Para o triângulo (p0, p1, p2) a aresta i vai do vértice i para o vértice i+1 e sua
+    # função é positiva do lado do vértice oposto. Triângulos no sentido contrário são
+    # invertidos para que o interior seja sempre onde as três funções são positivas.
+    start = xy
+    end = np.roll(xy, -1, axis=1)
+    a = start[..., 1] - end[..., 1]
+    b = end[..., 0] - start[..., 0]
+    c = start[..., 0] * end[..., 1] - start[..., 1] * end[..., 0]
+    area = c.sum(axis=1)  # duas vezes a área com sinal do triângulo
+    sign = np.where(area < 0, -1.0, 1.0)[:, np.newaxis]
+    a, b, c = a * sign, b * sign, c * sign
+
+    # Regra de preenchimento top-left: pixels exatamente sobre uma aresta só pertencem
+    # ao triângulo se a aresta for superior (horizontal) ou esquerda
+    top_left = ((a == 0) & (b > 0)) | (a > 0)
+    return a, b, c, np.abs(area), top_left
+
+def rasterize(xy, attrs, x0, y0, x1, y1, samples=1):
+    """Rasteriza triângulos dentro do retângulo [x0, x1) x [y0, y1) da tela."""
+    # O parâmetro xy possui as posições na tela dos vértices de cada triângulo (T, 3, 2)
+    # e attrs os atributos de cada vértice (T, 3, K) a serem interpolados, por exemplo
+    # a profundidade e as cores. As funções de aresta são avaliadas de uma só vez na
+    # caixa envoltória de cada triângulo. Com samples > 1 cada pixel é amostrado numa
+    # grade samples x samples e a fração coberta do pixel é retornada em coverage.
+    # Retorna as coordenadas x e y dos fragmentos, os valores dos atributos interpolados
+    # no centro de cada pixel (N, K) e a cobertura (N,) de cada um.
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 3, 2)
+    attrs = np.asarray(attrs, dtype=np.float64).reshape(len(xy), 3, -1)
+    a, b, c, area, top_left = edges(xy)
+
+    # Caixas envoltórias dos triângulos recortadas pelo retângulo
+    lower = np.floor(xy.min(axis=1)).astype(np.int64)
+    upper = np.ceil(xy.max(axis=1)).astype(np.int64)
+    lower = np.maximum(lower, [x0, y0])
+    upper = np.minimum(upper, [x1, y1])
+
+    # Posições das amostras dentro de um pixel
+    offsets = (np.arange(samples) + 0.5) / samples
+
+    frag_x, frag_y, frag_values, frag_coverage = [], [], [], []
+    for tri in np.flatnonzero(np.all(upper > lower, axis=1) & (area > 0)):
+        columns = np.arange(lower[tri, 0], upper[tri, 0])
+        rows = np.arange(lower[tri, 1], upper[tri, 1])
+
+        # Funções de aresta em todas as amostras da caixa envoltória (3, linhas, colunas)
+        sx = (columns[:, np.newaxis] + offsets).reshape(-1)
+        sy = (rows[:, np.newaxis] + offsets).reshape(-1)
+        values = (a[tri, :, np.newaxis, np.newaxis] * sx +
+                  b[tri, :, np.newaxis, np.newaxis] * sy[:, np.newaxis] +
+                  c[tri, :, np.newaxis, np.newaxis])
+        bias = top_left[tri, :, np.newaxis, np.newaxis]
+        inside = np.all((values > 0) | ((values == 0) & bias), axis=0)
+
+        if samples > 1:
+            # Fração das amostras cobertas em cada pixel
+            inside = inside.reshape(len(rows), samples, len(columns), samples)
+            coverage = inside.mean(axis=(1, 3))
+            covered = coverage > 0
+            coverage = coverage[covered]
+        else:
+            covered = inside
+            coverage = np.ones(np.count_nonzero(covered))
+        if not np.any(covered):
+            continue
+
+        py, px = np.nonzero(covered)
+        px = columns[px]
+        py = rows[py]
+
+        # Coordenadas baricêntricas no centro de cada pixel coberto. A função da aresta
+        # oposta a um vértice, normalizada pela área, é o peso desse vértice.
+        cx = px + 0.5
+        cy = py + 0.5
+        weights = (a[tri][:, np.newaxis] * cx + b[tri][:, np.newaxis] * cy +
+                   c[tri][:, np.newaxis]) / area[tri]
+        weights = np.roll(weights, -1, axis=0).T  # aresta (1, 2) é oposta ao vértice 0
+
+        frag_x.append(px)
+        frag_y.append(py)
+        frag_values.append(weights @ attrs[tri])
+        frag_coverage.append(coverage)
+
+    if not frag_x:
+        return (np.empty(0, np.int64), np.empty(0, np.int64),
+                np.empty((0, attrs.shape[2])), np.empty(0))
+    return (np.concatenate(frag_x), np.concatenate(frag_y),
+            np.concatenate(frag_values), np.concatenate(frag_coverage))
+
+def draw(xy, attrs, x0, y0, x1, y1):
+    """Rasteriza e grava no framebuffer triângulos com atributos [z, r, g, b]."""
+    x, y, values, _ = rasterize(xy, attrs, x0, y0, x1, y1)
+    if x.size:
+        colors = np.clip(values[:, 1:4] * 255, 0, 255).astype(np.uint8)
+        gpu.GPU.draw_fragments(x, y, values[:, 0], colors)
+
+def bin_triangles(xy, width, height, tile=TILE):
+    """Distribui os triângulos nos tiles da tela que suas caixas envoltórias tocam."""
+    # Retorna uma lista de (tx, ty, índices dos triângulos) só para os tiles ocupados
+    columns = -(-width // tile)
+    rows = -(-height // tile)
+    lower = np.floor(xy.min(axis=1)).astype(np.int64) // tile
+    upper = (np.ceil(xy.max(axis=1)).astype(np.int64) - 1) // tile
+    lower = np.maximum(lower, 0)
+    upper = np.minimum(upper, [columns - 1, rows - 1])
+    valid = np.all(upper >= lower, axis=1)
+
+    # Expande cada triângulo para a lista de tiles que ele cobre
+    triangles = np.flatnonzero(valid)
+    spans = upper[triangles] - lower[triangles] + 1
+    counts = spans[:, 0] * spans[:, 1]
+    tri = np.repeat(triangles, counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    span_x = np.repeat(spans[:, 0], counts)
+    tile_x = lower[tri, 0] + offset % span_x
+    tile_y = lower[tri, 1] + offset // span_x
+
+    # Agrupa os triângulos por tile mantendo a ordem de submissão
+    tile_id = tile_y * columns + tile_x
+    order = np.argsort(tile_id, kind="stable")
+    tile_id, tri = tile_id[order], tri[order]
+    ids, starts = np.unique(tile_id, return_index=True)
+    return [(tid % columns, tid // columns, group)
+            for tid, group in zip(ids, np.split(tri, starts[1:]))]
+
+
+# Processos auxiliares
+
+_attached = {}  # FrameBuffer compartilhado mapeado pelo processo auxiliar (só o atual)
+
+def draw_tile(job):
+    """Rasteriza um tile no FrameBuffer compartilhado (executado nos processos auxiliares)."""
+    descriptor, rect, xy, attrs = job
+    if descriptor is not None:
+        key = tuple(sorted(name for name, _, _ in descriptor.values()))
+        if key not in _attached:
+            # Fecha os mapeamentos do FrameBuffer anterior, que pode já ter sido liberado
+            # (nova resolução ou outro arquivo no lote); quem apaga a memória é o criador
+            for framebuffer in _attached.values():
+                framebuffer.release(unlink=False)
+            _attached.clear()
+            _attached[key] = gpu.FrameBuffer.attach(descriptor)
+        gpu.GPU.frame_buffer = [_attached[key]]
+        gpu.GPU.draw_framebuffer = 0
+    draw(xy, attrs, *rect)
+
+
+class TileRasterizer:
+    """Backend de rasterização que divide a tela em tiles e os processa em paralelo."""
+
+    def __init__(self, workers=None, tile=TILE):
+        """Cria o conjunto de processos auxiliares."""
+        self.workers = workers or multiprocessing.cpu_count()
+        self.tile = tile
+        self.pool = None
+        self.xy = []     # triângulos submetidos no quadro atual
+        self.attrs = []  # atributos dos triângulos submetidos no quadro atual
+        if self.workers > 1:
+            # spawn evita herdar o estado da interface gráfica nos processos auxiliares
+            context = multiprocessing.get_context("spawn")
+            self.pool = context.Pool(self.workers)
+
+    def submit(self, xy, attrs):
+        """Acumula triângulos para serem rasterizados ao final do quadro."""
+        if len(xy):
+            self.xy.append(np.asarray(xy, dtype=np.float64))
+            self.attrs.append(np.asarray(attrs, dtype=np.float64))
+
+    def flush(self):
+        """Rasteriza todos os triângulos acumulados no FrameBuffer de desenho atual."""
+        if not self.xy:
+            return
+        xy = np.concatenate(self.xy)
+        attrs = np.concatenate(self.attrs)
+        self.xy, self.attrs = [], []
+
+        framebuffer = gpu.GPU.frame_buffer[gpu.GPU.draw_framebuffer]
+        height, width = framebuffer.depth.shape[:2]
+
+        # Somente FrameBuffers em memória compartilhada podem ser escritos pelos auxiliares
+        descriptor = framebuffer.descriptor() if self.pool else {}
+        parallel = self.pool and len(descriptor) == 2
+
+        jobs = []
+        for tile_x, tile_y, group in bin_triangles(xy, width, height, self.tile):
+            rect = (tile_x * self.tile, tile_y * self.tile,
+                    min((tile_x + 1) * self.tile, width), min((tile_y + 1) * self.tile, height))
+            jobs.append((descriptor if parallel else None, rect, xy[group], attrs[group]))
+
+        if parallel:
+            # Tiles são disjuntos, então cada auxiliar escreve numa região exclusiva
+            chunk = max(1, len(jobs) // (4 * self.workers))
+            self.pool.map(draw_tile, jobs, chunksize=chunk)
+        else:
+            for job in jobs:
+                draw_tile(job)
+
+    def close(self):
+        """Encerra os processos auxiliares."""
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
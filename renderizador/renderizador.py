@@ -10,11 +10,17 @@ Data: 28 de Agosto de 2020
 """
 
 import os           # Para rotinas do sistema operacional
+import sys          # Para a saída padrão binária na exportação de vídeo
+import contextlib   # Para desviar as mensagens da saída padrão
+import glob         # Para expandir padrões de nomes de arquivos
+import time         # Para medir o tempo de renderização em lote
 import argparse     # Para tratar os parâmetros da linha de comando
+import multiprocessing  # Para renderizar vários arquivos em paralelo
 
 import gl           # Recupera rotinas de suporte ao X3D
+import raster       # Rasterização de triângulos, inclusive em tiles paralelos
+import pipeline     # Renderização em thread separada da exibição
 
-import interface    # Janela de visualização baseada no Matplotlib
 import gpu          # Simula os recursos de uma GPU
 
 import x3d          # Faz a leitura do arquivo X3D, gera o grafo de cena e faz traversal
@@ -35,44 +41,42 @@ class Renderizador:
         self.image_file = "tela.png"
         self.scene = None
         self.framebuffers = {}
+        self.jobs = 0  # processos para a rasterização em tiles (0 desabilita)
+        self.samples = 1  # amostras por eixo de cada pixel (supersampling)
 
     def setup(self):
         """Configura o sistema para a renderização."""
+        # Definindo tamanho do Viewport para renderização
+        self.scene.viewport(width=self.width, height=self.height)
+
+        # Ao renderizar vários arquivos os FrameBuffers do mesmo tamanho são reaproveitados
+        if "BACK" in self.framebuffers:
+            fbo = gpu.GPU.frame_buffer[self.framebuffers["BACK"]]
+            if fbo.color.shape[:2] == (self.height, self.width):
+                return
+
         # Configurando color buffers para exibição na tela
 
-        # Cria uma (1) posição de FrameBuffer na GPU
-        fbo = gpu.GPU.gen_framebuffers(1)
+        # Cria duas (2) posições de FrameBuffer na GPU (double buffering)
+        if "BACK" not in self.framebuffers:
+            fbo = gpu.GPU.gen_framebuffers(2)
 
-        # Define o atributo FRONT como o FrameBuffe principal
-        self.framebuffers["FRONT"] = fbo[0]
+            # Define o atributo FRONT como o FrameBuffer exibido e BACK como o desenhado
+            self.framebuffers["FRONT"] = fbo[0]
+            self.framebuffers["BACK"] = fbo[1]
 
-        # Define que a posição criada será usada para desenho e leitura
-        gpu.GPU.bind_framebuffer(gpu.GPU.FRAMEBUFFER, self.framebuffers["FRONT"])
+        # Desenha no BACK enquanto o FRONT (quadro anterior) é lido, swap_buffers() troca os dois
+        gpu.GPU.bind_framebuffer(gpu.GPU.DRAW_FRAMEBUFFER, self.framebuffers["BACK"])
+        gpu.GPU.bind_framebuffer(gpu.GPU.READ_FRAMEBUFFER, self.framebuffers["FRONT"])
         # Opções:
         # - DRAW_FRAMEBUFFER: Faz o bind só para escrever no framebuffer
         # - READ_FRAMEBUFFER: Faz o bind só para leitura no framebuffer
         # - FRAMEBUFFER: Faz o bind para leitura e escrita no framebuffer
 
-        # Aloca memória no FrameBuffer para um tipo e tamanho especificado de buffer
+        # Aloca memória nos FrameBuffers para um tipo e tamanho especificado de buffer
+        self.storage(self.framebuffers["FRONT"])
+        self.storage(self.framebuffers["BACK"])
 
-        # Memória de Framebuffer para canal de cores
-        gpu.GPU.framebuffer_storage(
-            self.framebuffers["FRONT"],
-            gpu.GPU.COLOR_ATTACHMENT,
-            gpu.GPU.RGB8,
-            self.width,
-            self.height
-        )
-
-        # Descomente as seguintes linhas se for usar um Framebuffer para profundidade
-        # gpu.GPU.framebuffer_storage(
-        #     self.framebuffers["FRONT"],
-        #     gpu.GPU.DEPTH_ATTACHMENT,
-        #     gpu.GPU.DEPTH_COMPONENT32F,
-        #     self.width,
-        #     self.height
-        # )
-    
         # Opções:
         # - COLOR_ATTACHMENT: alocações para as cores da imagem renderizada
         # - DEPTH_ATTACHMENT: alocações para as profundidades da imagem renderizada
@@ -91,8 +95,39 @@ class Renderizador:
         # Assuma 1.0 o mais afastado e -1.0 o mais próximo da camera
         gpu.GPU.clear_depth(1.0)
 
-        # Definindo tamanho do Viewport para renderização
-        self.scene.viewport(width=self.width, height=self.height)
+    def storage(self, position):
+        """Aloca os canais de cor e de profundidade de um FrameBuffer no tamanho da tela."""
+        # Com a rasterização em tiles paralelos a memória é compartilhada entre processos
+        shared = self.jobs > 1
+
+        # Memória de Framebuffer para canal de cores
+        gpu.GPU.framebuffer_storage(
+            position,
+            gpu.GPU.COLOR_ATTACHMENT,
+            gpu.GPU.RGB8,
+            self.width,
+            self.height,
+            shared=shared
+        )
+
+        # Memória de Framebuffer para canal de profundidade
+        gpu.GPU.framebuffer_storage(
+            position,
+            gpu.GPU.DEPTH_ATTACHMENT,
+            gpu.GPU.DEPTH_COMPONENT32F,
+            self.width,
+            self.height,
+            shared=shared
+        )
+
+    def ring(self, size):
+        """Posições de um anel de size FrameBuffers (FRONT, BACK e extras) para o pipeline."""
+        extra = self.framebuffers.setdefault("RING", [])
+        extra += gpu.GPU.gen_framebuffers(max(size - 2 - len(extra), 0))
+        for position in extra[:size - 2]:
+            if gpu.GPU.frame_buffer[position].color.shape[:2] != (self.height, self.width):
+                self.storage(position)
+        return [self.framebuffers["FRONT"], self.framebuffers["BACK"]] + extra[:size - 2]
 
     def pre(self):
         """Rotinas pré renderização."""
@@ -103,6 +138,8 @@ class Renderizador:
 
         # Recursos que podem ser úteis:
         # Define o valor do pixel no framebuffer: draw_pixel(coord, mode, data)
+        # Define os valores de um lote de pixels no framebuffer: draw_pixels(x, y, mode, data)
+        # Grava fragmentos com teste de profundidade: draw_fragments(x, y, z, data)
         # Retorna o valor do pixel no framebuffer: read_pixel(coord, mode)
 
     def pos(self):
@@ -113,8 +150,11 @@ class Renderizador:
         # ao final da renderização de um frame. Como por exemplo, executar
         # downscaling da imagem.
 
-        # Método para a troca dos buffers (NÃO IMPLEMENTADO)
-        # Esse método será utilizado na fase de implementação de animações
+        # Conclui a rasterização dos triângulos acumulados no quadro
+        gl.GL.flush()
+
+        # Troca os buffers: o quadro recém desenhado passa a ser o de leitura (FRONT)
+        # e o próximo quadro será desenhado no outro, sem sobrescrever o exibido
         gpu.GPU.swap_buffers()
 
     def mapping(self):
@@ -126,6 +166,7 @@ class Renderizador:
         x3d.X3D.renderer["TriangleSet2D"] = gl.GL.triangleSet2D
         x3d.X3D.renderer["TriangleSet"] = gl.GL.triangleSet
         x3d.X3D.renderer["Viewpoint"] = gl.GL.viewpoint
+        x3d.X3D.renderer["Frustum"] = gl.GL.frustum
         x3d.X3D.renderer["Transform_in"] = gl.GL.transform_in
         x3d.X3D.renderer["Transform_out"] = gl.GL.transform_out
         x3d.X3D.renderer["TriangleStripSet"] = gl.GL.triangleStripSet
@@ -143,55 +184,148 @@ class Renderizador:
         x3d.X3D.renderer["SplinePositionInterpolator"] = gl.GL.splinePositionInterpolator
         x3d.X3D.renderer["OrientationInterpolator"] = gl.GL.orientationInterpolator
 
-    def render(self):
-        """Laço principal de renderização."""
+    def render(self, instant=None):
+        """Laço principal de renderização (no instante informado ou no do relógio da cena)."""
         self.pre()  # executa rotina pré renderização
-        self.scene.render()  # faz o traversal no grafo de cena
+        self.scene.render(instant)  # faz o traversal no grafo de cena
         self.pos()  # executa rotina pós renderização
-        return gpu.GPU.get_frame_buffer()
+        return gpu.GPU.get_frame_buffer()  # quadro concluído, preservado durante o próximo render()
+
+    def render_file(self, x3d_file, image_file, width=None, height=None, cache=False, instant=0.0):
+        """Renderiza um arquivo X3D sem janela, reaproveitando o estado da GPU."""
+        # O quadro é do instante informado (e não do relógio), para que a mesma cena
+        # gere sempre a mesma imagem, em sequência ou em paralelo no lote
+        self.image_file = image_file
+        self.load(x3d_file, width, height, cache)
+        self.render(instant)
+        gpu.GPU.save_image(image_file)
+
+    def load(self, x3d_file, width=None, height=None, cache=False):
+        """Lê um arquivo X3D e prepara a GPU para renderizá-lo sem janela."""
+        self.x3d_file = x3d_file
+        self.width = width or self.width
+        self.height = height or self.height
+        path = os.path.dirname(os.path.abspath(x3d_file))
+
+        # Inicia a GPU só na primeira cena, mantendo os FrameBuffers para as próximas
+        if not self.framebuffers:
+            gpu.GPU(self.image_file, path)
+        gpu.GPU.image_file = self.image_file
+        gpu.GPU.path = path
+        gpu.GPU.textures.store = cache
+
+        # Descarta o estado estático deixado pela cena anterior
+        x3d.X3D.reset()
+        self.scene = x3d.X3D(x3d_file, cache=cache)
+        gl.GL.setup(self.width, self.height, near=0.01, far=1000, samples=self.samples)
+        self.mapping()
+        self.scene.parse()
+        self.setup()
+
+    def export(self, frames, step, write, start=0.0, workers=1, cache=False):
+        """Renderiza frames quadros da animação com tempo simulado e grava em segundo plano."""
+        # O quadro i ocorre no instante start + i*step, independente do tempo que a
+        # renderização leva, e a gravação de um quadro ocorre enquanto o próximo é desenhado
+        if workers > 1:
+            # Cada quadro depende só do seu instante, então processos auxiliares podem
+            # renderizar quadros diferentes; a gravação segue a ordem dos quadros
+            jobs = [(self.x3d_file, self.width, self.height, cache, start + index * step)
+                    for index in range(frames)]
+            writer = pipeline.Writer(write)
+            try:
+                context = multiprocessing.get_context("spawn")
+                with context.Pool(workers) as pool:
+                    chunk = max(1, frames // (4 * workers))
+                    for index, frame in enumerate(pool.imap(frame_job, jobs, chunksize=chunk)):
+                        writer.put(index, frame)
+            finally:
+                writer.close()
+            return writer.frames
+
+        ring = self.ring(pipeline.DEPTH + 2)
+        writer = pipeline.Writer(write, len(ring) - 2)
+        clock = x3d.X3D.clock
+        x3d.X3D.clock = x3d.FixedStepClock(step, start)
+        try:
+            for index in range(frames):
+                gpu.GPU.bind_framebuffer(gpu.GPU.DRAW_FRAMEBUFFER, ring[index % len(ring)])
+                writer.put(index, self.render())
+        finally:
+            x3d.X3D.clock = clock
+            writer.close()
+        return writer.frames
 
     def main(self):
         """Executa a renderização."""
         # Tratando entrada de parâmetro
         parser = argparse.ArgumentParser(add_help=False)   # parser para linha de comando
-        parser.add_argument("-i", "--input", help="arquivo X3D de entrada")
-        parser.add_argument("-o", "--output", help="arquivo 2D de saída (imagem)")
+        parser.add_argument("-i", "--input", help="arquivo(s) X3D de entrada", nargs="+")
+        parser.add_argument("-o", "--output", help="arquivo 2D de saída (imagem ou pasta no lote)")
         parser.add_argument("-w", "--width", help="resolução horizonta", type=int)
         parser.add_argument("-h", "--height", help="resolução vertical", type=int)
         parser.add_argument("-g", "--graph", help="imprime o grafo de cena", action='store_true')
         parser.add_argument("-p", "--pause", help="começa simulação em pausa", action='store_true')
         parser.add_argument("-q", "--quiet", help="não exibe janela", action='store_true')
+        parser.add_argument("-j", "--jobs", help="processos para rasterizar em tiles (ou no lote ou por quadro)", type=int)
+        parser.add_argument("-s", "--samples", help="amostras por eixo de cada pixel", type=int)
+        parser.add_argument("--stream", help="lê o X3D incrementalmente", action='store_true')
+        parser.add_argument("-c", "--cache", help="usa cache binário da cena e das texturas", action='store_true')
+        parser.add_argument("--frames", help="exporta quadros da animação sem janela", type=int)
+        parser.add_argument("--fps", help="quadros por segundo da exportação", type=float, default=30)
         args = parser.parse_args() # parse the arguments
-        if args.input:
-            self.x3d_file = args.input
+
+        # Vários arquivos (ou padrões como "*.x3d") são renderizados em lote, sem janela
+        inputs = [name for pattern in args.input or [] for name in sorted(glob.glob(pattern)) or [pattern]]
+        if len(inputs) > 1:
+            folder = args.output or "."
+            os.makedirs(folder, exist_ok=True)
+            jobs = [(name, os.path.join(folder, os.path.splitext(os.path.basename(name))[0] + ".png"),
+                     args.width, args.height, args.cache) for name in inputs]
+            for name, seconds, error in batch(jobs, args.jobs or 1):
+                print("{0:8.3f}s {1} {2}".format(seconds, name, error or ""))
+            return
+        if inputs:
+            self.x3d_file = inputs[0]
         if args.output:
             self.image_file = args.output
         if args.width:
             self.width = args.width
         if args.height:
             self.height = args.height
+        if args.jobs and not args.frames:  # na exportação são processos por quadro
+            self.jobs = args.jobs
+        if args.samples:
+            self.samples = args.samples
 
         path = os.path.dirname(os.path.abspath(self.x3d_file))
 
         # Iniciando simulação de GPU
         gpu.GPU(self.image_file, path)
+        gpu.GPU.textures.store = args.cache
 
         # Abre arquivo X3D
-        self.scene = x3d.X3D(self.x3d_file)
+        self.scene = x3d.X3D(self.x3d_file, streaming=args.stream, cache=args.cache)
+
+        # Backend opcional de rasterização em tiles
+        rasterizer = raster.TileRasterizer(self.jobs) if self.jobs else None
 
         # Iniciando Biblioteca Gráfica
         gl.GL.setup(
             self.width,
             self.height,
             near=0.01,
-            far=1000
+            far=1000,
+            rasterizer=rasterizer,
+            samples=self.samples
         )
 
         # Funções que irão fazer o rendering
         self.mapping()
 
-        # Se no modo silencioso não configurar janela de visualização
-        if not args.quiet:
+        # Se no modo silencioso (ou exportando) não configurar janela de visualização
+        if not (args.quiet or args.frames):
+            # A janela (e o Matplotlib) só é carregada quando for exibida
+            import interface  # pylint: disable=import-outside-toplevel
             window = interface.Interface(self.width, self.height, self.x3d_file)
             self.scene.set_preview(window)
 
@@ -204,12 +338,89 @@ class Renderizador:
         # Configura o sistema para a renderização.
         self.setup()
 
+        # Exporta a animação como sequência de imagens ou como vídeo bruto (rgb24)
+        if args.frames:
+            if self.image_file == "-":
+                # A saída padrão recebe só os pixels, as mensagens vão para a saída de erros
+                write = pipeline.raw_stream(sys.stdout.buffer)
+                with contextlib.redirect_stdout(sys.stderr):
+                    self.export(args.frames, 1 / args.fps, write, workers=args.jobs or 1,
+                                cache=args.cache)
+                sys.stdout.buffer.flush()
+            else:
+                pattern = self.image_file
+                if "%" not in pattern:  # tela.png -> tela0000.png, tela0001.png, ...
+                    root, extension = os.path.splitext(pattern)
+                    pattern = root + "%04d" + extension
+                if os.path.dirname(pattern):
+                    os.makedirs(os.path.dirname(pattern), exist_ok=True)
+                self.export(args.frames, 1 / args.fps, pipeline.image_sequence(pattern),
+                            workers=args.jobs or 1, cache=args.cache)
+
         # Se no modo silencioso salvar imagem e não mostrar janela de visualização
-        if args.quiet:
+        elif args.quiet:
+            self.render()  # Renderiza um quadro da cena
             gpu.GPU.save_image()  # Salva imagem em arquivo
-        else:
+        elif args.pause:
             window.set_saver(gpu.GPU.save_image)  # pasa a função para salvar imagens
             window.preview(args.pause, self.render)  # mostra visualização
+        else:
+            # Renderiza numa thread própria, a janela só exibe o quadro mais recente
+            frames = pipeline.Pipeline(self.render, self.ring(pipeline.DEPTH + 2)).start()
+            window.set_saver(frames.save)  # salva o quadro exibido, não o último renderizado
+            window.preview(args.pause, frames.latest, frames.fps)  # mostra visualização
+            frames.stop()
+
+        # Libera processos auxiliares e memória compartilhada
+        if rasterizer:
+            rasterizer.close()
+        for fbo in gpu.GPU.frame_buffer:
+            fbo.release()
+
+# Renderização em lote
+
+_renderizador = None  # Renderizador reaproveitado por todas as cenas do processo
+
+def render_job(job):
+    """Renderiza um item do lote, retornando o arquivo, o tempo gasto e o erro (se houver)."""
+    global _renderizador  # pylint: disable=global-statement
+    if _renderizador is None:
+        _renderizador = Renderizador()
+    x3d_file, image_file, width, height, cache = job
+    start = time.perf_counter()
+    try:
+        _renderizador.render_file(x3d_file, image_file, width, height, cache)
+        error = None
+    except Exception as exception:  # pylint: disable=broad-except
+        error = f"{type(exception).__name__}: {exception}"
+    return x3d_file, time.perf_counter() - start, error
+
+_cena = None  # cena carregada no processo auxiliar da exportação
+
+def frame_job(job):
+    """Renderiza um quadro da animação num processo auxiliar, retornando os pixels."""
+    global _renderizador, _cena  # pylint: disable=global-statement
+    if _renderizador is None:
+        _renderizador = Renderizador()
+    x3d_file, width, height, cache, instant = job
+    if _cena != (x3d_file, width, height):
+        _renderizador.load(x3d_file, width, height, cache)
+        _cena = (x3d_file, width, height)
+
+    # As mensagens vão para a saída de erros, a saída padrão pode ser o vídeo
+    with contextlib.redirect_stdout(sys.stderr):
+        return _renderizador.render(instant)
+
+def batch(jobs, workers=1):
+    """Renderiza sem janela uma lista de (X3D, imagem, largura, altura, cache)."""
+    # Com um só processo as cenas são renderizadas em sequência reaproveitando a GPU,
+    # com vários cada processo auxiliar mantém seu próprio Renderizador entre as cenas
+    if workers > 1:
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers) as pool:
+            return pool.map(render_job, jobs, chunksize=1)
+    return [render_job(job) for job in jobs]
+
 
 if __name__ == '__main__':
     renderizador = Renderizador()
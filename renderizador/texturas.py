@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Amostragem de Texturas com Mipmaps (vizinho mais próximo, bilinear e trilinear).
+
+Desenvolvido por: Luciano Soares <lpsoares@insper.edu.br>
+Disciplina: Computação Gráfica
+Data: 18 de Outubro de 2026
+"""
+
+import numpy as np  # Biblioteca do Numpy
+
+NEAREST = "nearest"      # texel mais próximo do nível 0
+BILINEAR = "bilinear"    # média dos 4 texels vizinhos no nível mais próximo
+TRILINEAR = "trilinear"  # média bilinear em dois níveis vizinhos
+FILTERS = (NEAREST, BILINEAR, TRILINEAR)
+
+
+def channels(level):
+    """Nível da textura como um vetor (largura, altura, canais)."""
+    # As texturas são guardadas transpostas (ver gpu.GPU.load_texture), o primeiro
+    # índice é a coluna x e o segundo a linha y da imagem
+    return level[:, :, np.newaxis] if level.ndim == 2 else level
+
+def wrap(index, size, repeat):
+    """Índices de texels repetidos (repeat) ou presos na borda da textura."""
+    return np.mod(index, size) if repeat else np.clip(index, 0, size - 1)
+
+def texel_coordinates(level, u, v):
+    """Posição contínua (em texels) das coordenadas (u, v) num nível."""
+    # O v cresce para cima e as linhas da imagem para baixo; o centro do texel i
+    # fica em i + 0.5
+    width, height = level.shape[:2]
+    return u * width - 0.5, (1 - v) * height - 0.5
+
+def fetch(level, x, y):
+    """Texels (N, C) nas colunas x e linhas y já dentro da textura."""
+    # Um único take com o índice linear é bem mais rápido que indexar os dois eixos
+    return np.take(level.reshape(-1, level.shape[2]), x * level.shape[1] + y, axis=0)
+
+def nearest(level, u, v, repeat_s=True, repeat_t=True):
+    """Cores (N, C) do texel mais próximo de cada coordenada (u, v)."""
+    level = channels(level)
+    x, y = texel_coordinates(level, u, v)
+    x = wrap(np.floor(x + 0.5).astype(np.int64), level.shape[0], repeat_s)
+    y = wrap(np.floor(y + 0.5).astype(np.int64), level.shape[1], repeat_t)
+    return fetch(level, x, y).astype(np.float32)
+
+def bilinear(level, u, v, repeat_s=True, repeat_t=True):
+    """Cores (N, C) da média ponderada dos 4 texels vizinhos de cada coordenada (u, v)."""
+    level = channels(level)
+    x, y = texel_coordinates(level, u, v)
+    x0 = np.floor(x)
+    y0 = np.floor(y)
+    fx = (x - x0).astype(np.float32)[:, np.newaxis]
+    fy = (y - y0).astype(np.float32)[:, np.newaxis]
+    x0 = x0.astype(np.int64)
+    y0 = y0.astype(np.int64)
+    x1 = wrap(x0 + 1, level.shape[0], repeat_s)
+    y1 = wrap(y0 + 1, level.shape[1], repeat_t)
+    x0 = wrap(x0, level.shape[0], repeat_s)
+    y0 = wrap(y0, level.shape[1], repeat_t)
+
+    # Os 4 vizinhos são lidos de uma só vez para todas as coordenadas
+    corner = fetch(level, x0, y0).astype(np.float32)
+    top = corner + (fetch(level, x1, y0) - corner) * fx
+    corner = fetch(level, x0, y1).astype(np.float32)
+    bottom = corner + (fetch(level, x1, y1) - corner) * fx
+    return top + (bottom - top) * fy
+
+def lod(size, dudx, dvdx, dudy, dvdy):
+    """Nível de detalhe (lambda) pela área da tela coberta por um pixel na textura."""
+    # As derivadas das coordenadas em relação a x e y da tela, convertidas em texels
+    # do nível 0, dão quantos texels um pixel cobre; cada nível reduz pela metade
+    width, height = size
+    along_x = np.hypot(dudx * width, dvdx * height)
+    along_y = np.hypot(dudy * width, dvdy * height)
+    with np.errstate(divide="ignore"):
+        return np.log2(np.maximum(along_x, along_y))
+
+def sample(levels, u, v, dudx=None, dvdx=None, dudy=None, dvdy=None,
+           repeat_s=True, repeat_t=True, mode=TRILINEAR):
+    """Cores (N, C) da textura nas coordenadas (u, v), com o filtro mode."""
+    # O parâmetro levels é a pirâmide de mipmaps (gpu.Texture.levels) e as derivadas
+    # dudx, dvdx, dudy e dvdy (N,) indicam a variação de u e v entre pixels vizinhos.
+    # Sem derivadas, ou no filtro do vizinho mais próximo, só o nível 0 é usado.
+    if mode not in FILTERS:
+        raise Exception(f"Filtro de textura inválido ({mode}), opções: {', '.join(FILTERS)}")
+    u = np.asarray(u, dtype=np.float64).reshape(-1)
+    v = np.asarray(v, dtype=np.float64).reshape(-1)
+    if mode == NEAREST:
+        return nearest(levels[0], u, v, repeat_s, repeat_t)
+    if dudx is None or len(levels) == 1:
+        return bilinear(levels[0], u, v, repeat_s, repeat_t)
+
+    # Magnificação (lambda < 0) usa o nível 0, minificação além do último nível usa o 1x1
+    detail = np.clip(lod(levels[0].shape[:2], dudx, dvdx, dudy, dvdy), 0, len(levels) - 1)
+    if mode == BILINEAR:
+        lower = np.rint(detail).astype(np.int64)
+        weight = np.zeros(len(u), dtype=np.float32)
+    else:
+        lower = np.floor(detail).astype(np.int64)
+        weight = (detail - lower).astype(np.float32)
+    upper = np.minimum(lower + 1, len(levels) - 1)
+
+    # Cada nível é amostrado só pelos fragmentos que precisam dele
+    colors = np.zeros((len(u), channels(levels[0]).shape[2]), dtype=np.float32)
+    for index in np.unique(lower):
+        chosen = np.flatnonzero(lower == index)
+        colors[chosen] = bilinear(levels[index], u[chosen], v[chosen], repeat_s, repeat_t) * \
+            (1 - weight[chosen, np.newaxis])
+    blended = np.flatnonzero(weight > 0)
+    for index in np.unique(upper[blended]):
+        chosen = blended[upper[blended] == index]
+        colors[chosen] += bilinear(levels[index], u[chosen], v[chosen], repeat_s, repeat_t) * \
+            weight[chosen, np.newaxis]
+    return colors
+
+def gradients(xy, attrs):
+    """Derivadas (T, K) de atributos lineares na tela em relação a x e a y."""
+    # Para cada triângulo (T, 3, 2) os atributos (T, 3, K) variam linearmente na tela,
+    # então suas derivadas são constantes e vêm da solução do sistema com as arestas
+    x1 = xy[:, 1, 0] - xy[:, 0, 0]
+    y1 = xy[:, 1, 1] - xy[:, 0, 1]
+    x2 = xy[:, 2, 0] - xy[:, 0, 0]
+    y2 = xy[:, 2, 1] - xy[:, 0, 1]
+    det = x1 * y2 - x2 * y1
+    det = np.where(det != 0, det, 1)[:, np.newaxis]
+    f1 = attrs[:, 1] - attrs[:, 0]
+    f2 = attrs[:, 2] - attrs[:, 0]
+    ddx = (f1 * y2[:, np.newaxis] - f2 * y1[:, np.newaxis]) / det
+    ddy = (f2 * x1[:, np.newaxis] - f1 * x2[:, np.newaxis]) / det
+    return ddx, ddy
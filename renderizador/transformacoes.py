@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Matrizes de Transformação em Coordenadas Homogêneas.
+
+Desenvolvido por: Luciano Soares <lpsoares@insper.edu.br>
+Disciplina: Computação Gráfica
+Data: 18 de Outubro de 2026
+"""
+
+import math         # Funções matemáticas
+import numpy as np  # Biblioteca do Numpy
+
+
+def translation(vector):
+    """Matriz de translação pelo vetor [x, y, z]."""
+    matrix = np.identity(4)
+    if vector:
+        matrix[:3, 3] = vector[:3]
+    return matrix
+
+def scale(vector):
+    """Matriz de escala pelos fatores [x, y, z]."""
+    matrix = np.identity(4)
+    if vector:
+        matrix[0, 0], matrix[1, 1], matrix[2, 2] = vector[:3]
+    return matrix
+
+def rotation(axis_angle):
+    """Matriz de rotação ao redor do eixo [x, y, z] por t radianos ([x, y, z, t])."""
+    matrix = np.identity(4)
+    if not axis_angle:
+        return matrix
+    axis = np.asarray(axis_angle[:3], dtype=np.float64)
+    norm = np.linalg.norm(axis)
+    if norm == 0 or axis_angle[3] == 0:
+        return matrix
+
+    # Usa o quatérnio unitário equivalente para montar a matriz de rotação
+    half = axis_angle[3] / 2
+    qi, qj, qk = axis / norm * math.sin(half)
+    qr = math.cos(half)
+    matrix[:3, :3] = [
+        [1 - 2*(qj*qj + qk*qk), 2*(qi*qj - qk*qr), 2*(qi*qk + qj*qr)],
+        [2*(qi*qj + qk*qr), 1 - 2*(qi*qi + qk*qk), 2*(qj*qk - qi*qr)],
+        [2*(qi*qk - qj*qr), 2*(qj*qk + qi*qr), 1 - 2*(qi*qi + qj*qj)],
+    ]
+    return matrix
+
+def model(translation_vector, scale_vector, rotation_axis_angle):
+    """Matriz de modelo de um Transform (translação * rotação * escala)."""
+    return translation(translation_vector) @ rotation(rotation_axis_angle) @ scale(scale_vector)
+
+def transform(translation_vector, rotation_axis_angle, scale_vector,
+              center=None, scale_orientation=None):
+    """Matriz local completa de um Transform do X3D (T * C * R * SR * S * -SR * -C)."""
+    center = np.asarray(center[:3] if center else [0, 0, 0], dtype=np.float64)
+    offset = np.asarray(translation_vector[:3] if translation_vector else [0, 0, 0]) + center
+    orientation = rotation(scale_orientation)
+    return (translation(list(offset)) @ rotation(rotation_axis_angle) @
+            orientation @ scale(scale_vector) @ orientation.T @ translation(list(-center)))
+
+def view(position, orientation):
+    """Matriz de visualização (inversa da posição e orientação da câmera)."""
+    inverse_rotation = rotation(orientation).T
+    return inverse_rotation @ translation([-value for value in position])
+
+def perspective(field_of_view, width, height, near, far):
+    """Matriz de projeção perspectiva a partir do campo de visão do Viewpoint."""
+    # O fieldOfView do X3D é convertido para o campo de visão vertical da tela
+    fovy = 2 * math.atan(math.tan(field_of_view / 2) * height / math.hypot(width, height))
+    top = near * math.tan(fovy)
+    right = top * width / height
+    return np.array([
+        [near/right, 0, 0, 0],
+        [0, near/top, 0, 0],
+        [0, 0, -(far+near)/(far-near), -2*far*near/(far-near)],
+        [0, 0, -1, 0],
+    ])
+
+def viewport(width, height):
+    """Matriz que leva coordenadas normalizadas (NDC) para coordenadas da tela."""
+    return np.array([
+        [width/2, 0, 0, width/2],
+        [0, -height/2, 0, height/2],
+        [0, 0, 1, 0],
+        [0, 0, 0, 1],
+    ])
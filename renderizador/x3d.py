@@ -17,6 +17,22 @@ import xml.etree.ElementTree
 # Outras
 import re
 import math
+import warnings
+import os
+import json
+import hashlib
+import time
+import copy
+import heapq
+
+# Numpy
+import numpy as np
+
+# Matrizes de transformação
+import transformacoes
+
+# Interpoladores de quadros-chave
+import interpoladores
 
 # Métodos de Apoio
 
@@ -45,6 +61,34 @@ def get_colors(appearance):
     return colors
 
 
+# Decodificadores de valores
+
+def split_values(val, convert):
+    """Separa os valores do texto por vírgulas ou espaços e converte um a um."""
+    val_str = re.split(r'[,\s]\s*', val)
+    return [convert(value) for value in val_str]
+
+def decode_values(val, dtype, convert):
+    """Converte o texto de um campo com vários valores usando o parser em C do Numpy."""
+    # As vírgulas são trocadas por espaços e todo o texto é convertido de uma só vez,
+    # o resultado volta como lista para manter o mesmo tipo do decodificador original.
+    # Se o texto tiver algo que o Numpy não entenda, usa a conversão valor a valor.
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")  # versões antigas só emitem aviso
+            return np.fromstring(val.replace(",", " "), dtype=dtype, sep=" ").tolist()
+    except (ValueError, DeprecationWarning):
+        return split_values(val, convert)
+
+def decode_floats(val):
+    """Converte texto com valores em ponto flutuante para uma lista."""
+    return decode_values(val, np.float64, float)
+
+def decode_ints(val):
+    """Converte texto com valores inteiros para uma lista."""
+    return decode_values(val, np.int64, int)
+
+
 # Leitores de Campos X3D
 
 def SFTime(node, field, default):
@@ -64,8 +108,7 @@ def MFFloat(node, field, default):
     if node is not None and field in node.attrib:
         val = node.attrib[field].strip()
         if val:
-            val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
+            return decode_floats(val)
         return []
     return default
 
@@ -74,8 +117,7 @@ def MFInt32(node, field, default):
     if node is not None and field in node.attrib:
         val = node.attrib[field].strip()
         if val:
-            val_str = re.split(r'[,\s]\s*', val)
-            return [int(value) for value in val_str]
+            return decode_ints(val)
         return []
     return default
 
@@ -91,8 +133,7 @@ def SFRotation(node, field, default):
     if node is not None and field in node.attrib:
         val = node.attrib[field].strip()
         if val:
-            val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
+            return decode_floats(val)
         return []
     return default
 
@@ -101,8 +142,7 @@ def SFColor(node, field, default):
     if node is not None and field in node.attrib:
         val = node.attrib[field].strip()
         if val:
-            val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
+            return decode_floats(val)
         return []
     return default
 
@@ -111,8 +151,7 @@ def MFColor(node, field, default):
     if node is not None and field in node.attrib:
         val = node.attrib[field].strip()
         if val:
-            val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
+            return decode_floats(val)
         return []
     return default
 
@@ -121,8 +160,7 @@ def SFVec3f(node, field, default):
     if node is not None and field in node.attrib:
         val = node.attrib[field].strip()
         if val:
-            val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
+            return decode_floats(val)
         return []
     return default
 
@@ -131,8 +169,7 @@ def MFVec3f(node, field, default):
     if node is not None and field in node.attrib:
         val = node.attrib[field].strip()
         if val:
-            val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
+            return decode_floats(val)
         return []
     return default
 
@@ -141,8 +178,7 @@ def MFVec2f(node, field, default):
     if node is not None and field in node.attrib:
         val = node.attrib[field].strip()
         if val:
-            val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
+            return decode_floats(val)
         return []
     return default
 
@@ -167,67 +203,109 @@ def MFNode(node, name, default):
         clean(child) # remove namespace
         if name == "X3DChildNode":
             if child.tag == "Shape":
-                children.append(Shape(child))
+                children.append(create(Shape, child))
             elif child.tag == "Transform":
-                children.append(Transform(child))
+                children.append(create(Transform, child))
 
     return children
 
+def create(kind, node):
+    """Cria o nó X3D do tipo informado ou recupera o nó já definido (DEF) indicado por USE."""
+    if "USE" not in node.attrib:
+        return kind(node)
+    name = node.attrib["USE"].strip()
+    if name not in X3DNode.named_nodes:
+        raise Exception("Nó " + name + " usado (USE) antes de ser definido (DEF).")
+    shared = X3DNode.named_nodes[name]
+    if not isinstance(shared, kind):
+        raise Exception("Nó " + name + " usado (USE) não é do tipo " + node.tag + ".")
+    return shared
+
 def SFNode(node, name, default):
     """Especifica um nó X3D."""
     for child in node:
         clean(child) # remove namespace
         if name == "X3DAppearanceNode":
             if child.tag == "Appearance":
-                appearance = Appearance(child)
+                appearance = create(Appearance, child)
                 X3D.current_appearance = appearance
                 return appearance
         elif name == "X3DGeometryNode":
             if child.tag == "Polypoint2D":
-                return Polypoint2D(child)
+                return create(Polypoint2D, child)
             if child.tag == "Polyline2D":
-                return Polyline2D(child)
+                return create(Polyline2D, child)
             if child.tag == "Circle2D":
-                return Circle2D(child)
+                return create(Circle2D, child)
             if child.tag == "TriangleSet2D":
-                return TriangleSet2D(child)
+                return create(TriangleSet2D, child)
             if child.tag == "TriangleSet":
-                return TriangleSet(child)
+                return create(TriangleSet, child)
             if child.tag == "TriangleStripSet":
-                return TriangleStripSet(child)
+                return create(TriangleStripSet, child)
             if child.tag == "IndexedTriangleStripSet":
-                return IndexedTriangleStripSet(child)
+                return create(IndexedTriangleStripSet, child)
             if child.tag == "Box":
-                return Box(child)
+                return create(Box, child)
             if child.tag == "Sphere":
-                return Sphere(child)
+                return create(Sphere, child)
             if child.tag == "Cone":
-                return Cone(child)
+                return create(Cone, child)
             if child.tag == "Cylinder":
-                return Cylinder(child)
+                return create(Cylinder, child)
             if child.tag == "IndexedFaceSet":
-                return IndexedFaceSet(child)
+                return create(IndexedFaceSet, child)
         elif name == "X3DMaterialNode":
             if child.tag == "Material":
-                return Material(child)
+                return create(Material, child)
         elif name == "X3DTextureNode":
             if child.tag == "ImageTexture":
-                return ImageTexture(child)
+                return create(ImageTexture, child)
         elif name == "X3DCoordinateNode":
             if child.tag == "Coordinate":
-                return Coordinate(child)
+                return create(Coordinate, child)
         elif name == "X3DColorNode":
             if child.tag == "Color":
-                return Color(child)
+                return create(Color, child)
         elif name == "X3DTextureCoordinateNode":
             if child.tag == "TextureCoordinate":
-                return TextureCoordinate(child)
+                return create(TextureCoordinate, child)
 
     return default
 
 
 # Estrutura do X3D
 
+class RealTimeClock:
+    """Relógio de tempo real: cada quadro ocorre no instante em que é renderizado."""
+
+    def time(self):
+        """Instante (em segundos desde a epoch) do próximo quadro."""
+        return time.time()
+
+
+class FixedStepClock:
+    """Relógio simulado: o quadro n ocorre no instante start + n*step."""
+
+    def __init__(self, step, start=0.0):
+        """Define o passo (em segundos) entre quadros e o instante do primeiro."""
+        if step <= 0:
+            raise Exception(f"Passo do relógio deve ser maior que zero: {step}")
+        self.step = step
+        self.start = start
+        self.frame = 0  # próximo quadro
+
+    def time(self):
+        """Instante do próximo quadro, avançando um passo."""
+        instant = self.start + self.frame * self.step
+        self.frame += 1
+        return instant
+
+    def seek(self, frame):
+        """Faz o próximo quadro ser o informado."""
+        self.frame = frame
+
+
 class X3D:
     """
     Classe responsável por fazer o Parse do arquivo X3D.
@@ -237,7 +315,7 @@ class X3D:
     Atributos
     ----------
     root : Element
-        raiz do grafo de cena X3D em XMl
+        raiz do grafo de cena X3D em XMl (None no modo streaming)
 
     current_color : {list[3]} (static)
         dicionário com as cores no formato RGB usadas no momento ["diffuseColor", "emissiveColor"]
@@ -246,6 +324,8 @@ class X3D:
         objeto de aparencia em X3D
     current_texture = String (static)
         URL das texturas
+    current_repeat = (bool, bool) (static)
+        se a textura atual se repete nas direções s e t
 
     preview : interface (static)
          sistema de preview para geometrias 2D simples
@@ -256,23 +336,55 @@ class X3D:
     -------
     parse():
         Realiza o parse e já realiza as rotinas de renderização.
+    parse_stream():
+        Realiza o parse incremental do arquivo, liberando o XML já consumido.
+    reset():
+        Restaura o estado estático compartilhado antes de ler outra cena.
     """
 
-    current_color = {  # controle de cor instantânea
+    default_color = {  # cor padrão quando não há material
         "diffuseColor": [0.8, 0.8, 0.8],
         "emissiveColor": [0.0, 0.0, 0.0],
         "transparency": 0.0,
     }
+    current_color = dict(default_color)  # controle de cor instantânea
     current_appearance = None  # objeto de aparencia atual
     current_texture = []  # controle de texturas instantâneas
+    current_repeat = (True, True)  # repetição (repeatS, repeatT) da textura atual
+    current_matrix = np.identity(4)  # matriz do mundo do Transform atual
     preview = None  # atributo que aponta para o sistema de preview
     renderer = {}  # dicionario dos métodos de renderização
+    clock = RealTimeClock()  # relógio que define o instante de cada quadro
+    now = 0.0  # instante (em segundos) do quadro sendo renderizado
 
-    def __init__(self, filename):
+    def __init__(self, filename, streaming=False, cache=False):
         """Constroi o atributo para a raiz do grafo X3D."""
-        self.root = xml.etree.ElementTree.parse(filename).getroot()
+        # No modo streaming o XML não é carregado inteiro na memória, os nós da cena
+        # são construídos conforme o arquivo é lido (ver parse_stream). Com cache o
+        # grafo de cena já lido é gravado e recuperado de um arquivo binário .x3dc.
+        self.filename = filename
+        self.streaming = streaming
+        self.cache = cache
+        self.root = None
         self.scene = None  # Referência para o objeto da cena
 
+        # Com cache o XML só é carregado se a cena não puder ser recuperada (ver parse)
+        if not streaming and not cache:
+            self.root = xml.etree.ElementTree.parse(filename).getroot()
+
+    @staticmethod
+    def reset():
+        """Restaura o estado compartilhado entre as cenas (ao ler vários arquivos)."""
+        X3D.current_color = dict(X3D.default_color)
+        X3D.current_appearance = None
+        X3D.current_texture = []
+        X3D.current_repeat = (True, True)
+        X3D.current_matrix = np.identity(4)
+        X3D.preview = None
+        X3D.clock = RealTimeClock()
+        X3D.now = 0.0
+        X3DNode.named_nodes = {}
+
     def set_preview(self, preview):
         """Armazena as rotinas para fazer o render da cena."""
         X3D.preview = preview
@@ -284,70 +396,571 @@ class X3D:
 
     def parse(self):
         """Leitura da cena começando da raiz do X3D."""
-        for child in self.root:
-            clean(child) # remove namespace
-            if child.tag == "Scene":
-                self.scene = Scene(child)
-
-    def render(self):
+        if self.cache and self.load_cache():
+            return
+        if self.streaming:
+            self.parse_stream()
+        else:
+            if self.root is None:
+                self.root = xml.etree.ElementTree.parse(self.filename).getroot()
+            for child in self.root:
+                clean(child) # remove namespace
+                if child.tag == "Scene":
+                    self.scene = Scene(child)
+        if self.cache:
+            self.save_cache()
+
+    def parse_stream(self):
+        """Leitura incremental da cena, liberando cada nó XML assim que é consumido."""
+        # Cada Shape ou Transform é convertido em nó X3D quando seu elemento termina de
+        # ser lido, e depois removido da árvore XML, também dentro de outros Transforms.
+        # Os filhos já convertidos aguardam em children até o Transform pai terminar.
+        # Assim a memória do XML depende do maior Shape e não do tamanho do arquivo.
+        path = []  # elementos abertos desde a raiz até o elemento atual
+        children = {}  # Transform aberto (id do elemento) -> filhos já convertidos
+        for event, element in xml.etree.ElementTree.iterparse(self.filename,
+                                                               events=("start", "end")):
+            if event == "start":
+                clean(element) # remove namespace
+                if len(path) == 1 and element.tag == "Scene":
+                    self.scene = Scene()
+                elif element.tag == "Transform" and (
+                        (len(path) == 2 and path[1].tag == "Scene") or (path and id(path[-1]) in children)):
+                    children[id(element)] = []
+                path.append(element)
+                continue
+
+            path.pop()
+            built = children.pop(id(element), None)
+            if len(path) == 2 and path[1].tag == "Scene":
+                node = self.scene.add(element)
+                if built and node is not None and "USE" not in element.attrib:
+                    node.children.extend(built)
+                path[1].remove(element)  # libera o elemento já convertido
+            elif path and id(path[-1]) in children and element.tag in ("Shape", "Transform"):
+                node = create(Shape if element.tag == "Shape" else Transform, element)
+                if built and "USE" not in element.attrib:
+                    node.children.extend(built)
+                children[id(path[-1])].append(node)
+                path[-1].remove(element)
+            elif len(path) == 1:
+                if element.tag == "Scene":
+                    self.scene.finish()
+                path[0].remove(element)
+
+    @staticmethod
+    def tick(instant=None):
+        """Define o instante do quadro: o informado ou o próximo do relógio."""
+        X3D.now = X3D.clock.time() if instant is None else instant
+
+    def render(self, instant=None):
         """Renderização da cena começando da raiz do X3D."""
+        # Com o instante informado o quadro não depende dos quadros anteriores
+        X3D.tick(instant)
         self.scene.render()
 
+    # Cache binário da cena compilada (.x3dc)
+    # O arquivo começa com CACHE_MAGIC e o tamanho de um cabeçalho JSON com a versão do
+    # parser, o hash do X3D de origem e a posição de cada bloco. Em seguida vem o grafo
+    # de cena em JSON (ver CacheEncoder) e os vetores do Numpy gravados crus, alinhados,
+    # para serem lidos diretamente por um mapa de memória. Nenhum código é executado na
+    # leitura: só classes deste módulo são recriadas, a partir dos valores dos campos.
+
+    CACHE_MAGIC = b"X3DC"
+    CACHE_ALIGN = 64
+    CACHE_MODULES = ("x3d", "transformacoes", "interpoladores", "primitivas", "gl")
+
+    CACHE_VERSION = None  # calculada uma vez por processo em parser_version()
+
+    @staticmethod
+    def parser_version():
+        """Identifica a versão do parser pelo conteúdo dos módulos usados pela cena."""
+        if X3D.CACHE_VERSION is None:
+            digest = hashlib.sha256()
+            folder = os.path.dirname(os.path.abspath(__file__))
+            for module in X3D.CACHE_MODULES:
+                with open(os.path.join(folder, module + ".py"), "rb") as source:
+                    digest.update(source.read())
+            X3D.CACHE_VERSION = digest.hexdigest()
+        return X3D.CACHE_VERSION
+
+    def source_hash(self):
+        """Hash do conteúdo do arquivo X3D de origem."""
+        with open(self.filename, "rb") as source:
+            return hashlib.sha256(source.read()).hexdigest()
+
+    def cache_file(self):
+        """Nome do arquivo de cache ao lado do arquivo X3D."""
+        return os.path.splitext(self.filename)[0] + ".x3dc"
+
+    def load_cache(self):
+        """Recupera a cena do cache, retornando False se ele não existir ou for inválido."""
+        # A pré-visualização 2D é montada durante o parse, então não usa o cache
+        if X3D.preview:
+            return False
+        try:
+            with open(self.cache_file(), "rb") as cache:
+                if cache.read(len(X3D.CACHE_MAGIC)) != X3D.CACHE_MAGIC:
+                    return False
+                size = int.from_bytes(cache.read(4), "little")
+                header = json.loads(cache.read(size))
+            if header["version"] != X3D.parser_version() or header["hash"] != self.source_hash():
+                return False
+
+            # Os vetores apontam direto para o arquivo mapeado em memória (somente leitura)
+            data = np.memmap(self.cache_file(), dtype=np.uint8, mode="r")
+            arrays = [data[offset:offset + np.prod(shape, dtype=np.int64) * np.dtype(dtype).itemsize]
+                      .view(dtype).reshape(shape) for offset, dtype, shape in header["arrays"]]
+            offset, length = header["graph"]
+            graph = CacheDecoder(json.loads(data[offset:offset+length].tobytes()), arrays).decode()
+        except Exception:  # pylint: disable=broad-except
+            return False  # cache corrompido ou incompatível: faz o parse completo
+
+        self.scene = graph["scene"]
+        X3DNode.named_nodes.update(graph["named_nodes"])
+        return True
+
+    def save_cache(self):
+        """Grava a cena lida no arquivo de cache (falhas de escrita são ignoradas)."""
+        if X3D.preview or self.scene is None:
+            return
+        encoder = CacheEncoder()
+        try:
+            graph = json.dumps(encoder.encode_graph({"scene": self.scene,
+                                                     "named_nodes": X3DNode.named_nodes})).encode()
+        except TypeError as error:
+            warnings.warn(f"Cena não gravada no cache: {error}")
+            return
+
+        # Calcula a posição de cada bloco já com o cabeçalho e o alinhamento. O tamanho
+        # do cabeçalho depende das posições, e vice-versa: repete até as posições pararem
+        # de mudar.
+        def align(position):
+            return -(-position // X3D.CACHE_ALIGN) * X3D.CACHE_ALIGN
+        header = {"version": X3D.parser_version(), "hash": self.source_hash(), "graph": None, "arrays": []}
+        while True:
+            start = align(len(X3D.CACHE_MAGIC) + 4 + len(json.dumps(header).encode()))
+            placed = {"graph": [start, len(graph)], "arrays": []}
+            position = start + len(graph)
+            for array in encoder.arrays:
+                position = align(position)
+                placed["arrays"].append([position, array.dtype.str, list(array.shape)])
+                position += array.nbytes
+            if placed["graph"] == header["graph"] and placed["arrays"] == header["arrays"]:
+                break
+            header.update(placed)
+
+        # Grava num arquivo temporário de cada processo e troca no final, para que
+        # processos gravando a mesma cena em paralelo (lote ou quadros) não se misturem
+        encoded = json.dumps(header).encode()
+        temporary = f"{self.cache_file()}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as cache:
+                cache.write(X3D.CACHE_MAGIC + len(encoded).to_bytes(4, "little") + encoded)
+                for (offset, *_), block in zip([header["graph"]] + header["arrays"],
+                                               [graph] + encoder.arrays):
+                    cache.write(b"\0" * (offset - cache.tell()))
+                    cache.write(block if isinstance(block, bytes) else block.data)
+            os.replace(temporary, self.cache_file())
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+class CacheEncoder:
+    """Converte o grafo de cena em valores JSON, com os vetores numéricos gravados à parte."""
+
+    # Cada valor vira um valor JSON: números, textos, booleanos e None ficam iguais e as
+    # listas curtas viram listas. Os outros tipos viram um objeto JSON de uma só chave:
+    # {"list": i} e {"array": i} para listas numéricas longas e vetores do Numpy (o i-ésimo
+    # vetor gravado fora do JSON), {"tuple": [...]}, {"dict": [[chave, valor], ...]},
+    # {"scalar": [tipo, valor]} para números do Numpy e {"node": i} para o i-ésimo objeto
+    # de uma classe deste módulo. Objetos referenciados mais de uma vez (DEF/USE) são
+    # gravados uma só vez.
+
+    def __init__(self):
+        """Começa sem objetos e sem vetores."""
+        self.objects = []  # [nome da classe, campos] de cada objeto
+        self.memo = {}     # id do objeto -> posição em objects
+        self.arrays = []   # vetores contíguos gravados fora do JSON
+
+    def encode_graph(self, value):
+        """Grafo completo: o valor raiz e a tabela de objetos."""
+        root = self.encode(value)
+        return {"root": root, "objects": self.objects}
+
+    def encode(self, value):
+        """Valor JSON que representa value."""
+        kind = type(value)
+        if value is None or kind in (bool, int, float, str):
+            return value
+        if kind is list:
+            if len(value) > 64:
+                first = type(value[0])
+                if first in (float, int) and all(type(item) is first for item in value):  # pylint: disable=unidiomatic-typecheck
+                    self.arrays.append(np.array(value, dtype=np.float64 if first is float else np.int64))
+                    return {"list": len(self.arrays) - 1}
+            return [self.encode(item) for item in value]
+        if kind is tuple:
+            return {"tuple": [self.encode(item) for item in value]}
+        if kind is dict:
+            return {"dict": [[self.encode(key), self.encode(item)] for key, item in value.items()]}
+        if kind is np.ndarray:
+            self.arrays.append(np.ascontiguousarray(value))
+            return {"array": len(self.arrays) - 1}
+        if isinstance(value, np.generic):
+            return {"scalar": [value.dtype.str, value.item()]}
+        if kind.__module__ == __name__ and hasattr(value, "__dict__"):
+            if id(value) not in self.memo:
+                self.memo[id(value)] = len(self.objects)
+                self.objects.append(None)  # reserva a posição (referências circulares)
+                self.objects[self.memo[id(value)]] = [kind.__name__, self.encode(vars(value))]
+            return {"node": self.memo[id(value)]}
+        raise TypeError(f"tipo {kind.__name__} não pode ser gravado no cache")
+
+
+class CacheDecoder:
+    """Reconstrói o grafo de cena gravado pelo CacheEncoder."""
+
+    def __init__(self, graph, arrays):
+        """Recebe o grafo em JSON e os vetores (mapeados em memória) do cache."""
+        self.graph = graph
+        self.arrays = arrays
+        self.objects = []
+
+    def decode(self):
+        """Valor raiz do grafo, com todos os objetos recriados."""
+        # Os objetos são criados vazios antes, sem chamar os construtores, para que as
+        # referências entre eles (inclusive circulares) possam ser resolvidas
+        for name, _ in self.graph["objects"]:
+            kind = globals().get(name)
+            if not (isinstance(kind, type) and kind.__module__ == __name__):
+                raise Exception(f"Classe inválida no cache: {name}")
+            self.objects.append(object.__new__(kind))
+        for instance, (_, fields) in zip(self.objects, self.graph["objects"]):
+            instance.__dict__.update(self.value(fields))
+        return self.value(self.graph["root"])
+
+    def value(self, encoded):
+        """Valor do Python representado pelo valor JSON."""
+        if isinstance(encoded, list):
+            return [self.value(item) for item in encoded]
+        if not isinstance(encoded, dict):
+            return encoded
+        (tag, content), = encoded.items()
+        if tag == "list":
+            return self.arrays[content].tolist()
+        if tag == "array":
+            return self.arrays[content]
+        if tag == "tuple":
+            return tuple(self.value(item) for item in content)
+        if tag == "dict":
+            return {self.value(key): self.value(item) for key, item in content}
+        if tag == "scalar":
+            return np.dtype(content[0]).type(content[1])
+        if tag == "node":
+            return self.objects[content]
+        raise Exception(f"Valor inválido no cache: {tag}")
+
 class Scene:
     """O nó Scene acomoda a cena X3D."""
 
-    def __init__(self, node):
+    def __init__(self, node=None):
         """Parse do nó X3D."""
+        # Sem o nó XML a cena é montada incrementalmente com add() e finish()
         self.children = []
-        lights = []
-        viewpoint = None
-        navigation_info = None
-        fog = None
-
-        for child in node:
-            clean(child)  # remove namespace
-            if child.tag == "Transform":
-                self.children.append(Transform(child))
-            elif child.tag == "Shape":
-                self.children.append(Shape(child))
-            elif child.tag == "TimeSensor":
-                self.children.append(TimeSensor(child))
-            elif child.tag == "SplinePositionInterpolator":
-                self.children.append(SplinePositionInterpolator(child))
-            elif child.tag == "OrientationInterpolator":
-                self.children.append(OrientationInterpolator(child))
-            elif child.tag == "ROUTE":
-                self.children.append(ROUTE(child))
-            elif child.tag == "DirectionalLight":
-                lights.append(DirectionalLight(child))
-            elif child.tag == "PointLight":
-                lights.append(PointLight(child))
-            elif child.tag == "Viewpoint":
-                viewpoint = Viewpoint(child)
-            elif child.tag == "NavigationInfo":
-                navigation_info = NavigationInfo(child)
-            elif child.tag == "Fog":
-                fog = Fog(child)
-
-        self.children = lights + self.children  # deixa luzes primeiro
-
-        if navigation_info:  # garante tratar o Viewpoint antes dos outros nós
-            self.children.insert(0, navigation_info)
+        self.lights = []
+        self.viewpoint = None
+        self.navigation_info = None
+        self.fog = None
+        self.events = None  # cascata de eventos compilada no primeiro quadro
+        self.draw_list = None  # lista de desenho compilada no primeiro quadro
+
+        if node is not None:
+            for child in node:
+                self.add(child)
+            self.finish()
+
+    def add(self, child):
+        """Parse de um nó filho do Scene, retornando o nó criado (None se ignorado)."""
+        clean(child)  # remove namespace
+        node = None
+        if child.tag == "Transform":
+            node = create(Transform, child)
+            self.children.append(node)
+        elif child.tag == "Shape":
+            node = create(Shape, child)
+            self.children.append(node)
+        elif child.tag == "TimeSensor":
+            node = TimeSensor(child)
+            self.children.append(node)
+        elif child.tag == "SplinePositionInterpolator":
+            node = SplinePositionInterpolator(child)
+            self.children.append(node)
+        elif child.tag == "OrientationInterpolator":
+            node = OrientationInterpolator(child)
+            self.children.append(node)
+        elif child.tag == "ROUTE":
+            node = ROUTE(child)
+            self.children.append(node)
+        elif child.tag == "DirectionalLight":
+            node = DirectionalLight(child)
+            self.lights.append(node)
+        elif child.tag == "PointLight":
+            node = PointLight(child)
+            self.lights.append(node)
+        elif child.tag == "Viewpoint":
+            node = self.viewpoint = Viewpoint(child)
+        elif child.tag == "NavigationInfo":
+            node = self.navigation_info = NavigationInfo(child)
+        elif child.tag == "Fog":
+            node = self.fog = Fog(child)
+        return node
+
+    def finish(self):
+        """Organiza a ordem de renderização após o parse de todos os filhos."""
+        self.children = self.lights + self.children  # deixa luzes primeiro
+
+        if self.navigation_info:  # garante tratar o Viewpoint antes dos outros nós
+            self.children.insert(0, self.navigation_info)
         else:  # cria um navigation_info se não definido
             self.children.insert(0, NavigationInfo())
 
-        if viewpoint:  # garante tratar o Viewpoint primeiro que tudo
-            self.children.insert(0, viewpoint)
+        if self.viewpoint:  # garante tratar o Viewpoint primeiro que tudo
+            self.children.insert(0, self.viewpoint)
         else:  # cria um viewpoint se não definido
             self.children.insert(0, Viewpoint())
 
-        if fog:  # garante que fog seja o último nó
-            self.children.append(fog)
+        if self.fog:  # garante que fog seja o último nó
+            self.children.append(self.fog)
+
+    def compile(self):
+        """Compila os nós de eventos e ROUTEs e achata Transforms e Shapes numa lista de desenho."""
+        nodes = [child for child in self.children
+                 if not isinstance(child, (Transform, Shape, ROUTE)) and child is not self.fog]
+        routes = [child for child in self.children if isinstance(child, ROUTE)]
+        self.events = EventGraph(nodes, routes)
+        self.draw_list = DrawList(self.children)
+
+    def update(self):
+        """Processa câmera, luzes, sensores, interpoladores e rotas."""
+        if self.draw_list is None:
+            self.compile()
+        self.events.run()
 
     def render(self):
         """Rotina de renderização."""
-        for child in self.children:
-            child.render()
+        # Câmera, luzes, sensores, interpoladores e rotas são tratados antes das geometrias
+        self.update()
+        self.draw_list.render()
+        if self.fog:
+            self.fog.render()
+
+
+def transform_boxes(lower, upper, matrices):
+    """Caixas alinhadas aos eixos que envolvem as caixas (N, 3) transformadas pelas matrizes."""
+    center = (lower + upper) / 2
+    extent = (upper - lower) / 2
+    center = np.einsum("nij,nj->ni", matrices[:, :3, :3], center) + matrices[:, :3, 3]
+    extent = np.einsum("nij,nj->ni", np.abs(matrices[:, :3, :3]), extent)
+    return center - extent, center + extent
+
+def inside_frustum(planes, lower, upper):
+    """Indica as caixas que não estão totalmente fora de algum dos planos (a, b, c, d)."""
+    # Para cada plano basta testar o vértice da caixa mais à frente na direção da normal
+    normals = planes[:, np.newaxis, :3]
+    corner = np.where(normals >= 0, upper, lower)
+    with np.errstate(invalid="ignore"):  # caixas infinitas de geometrias desconhecidas
+        distance = (corner * normals).sum(axis=2) + planes[:, np.newaxis, 3]
+    return ~np.any(distance < 0, axis=0)
+
+
+class DrawList:
+    """Grafo de cena achatado num vetor de chamadas de desenho (matriz, material, geometria)."""
+
+    def __init__(self, children):
+        """Percorre o grafo uma vez registrando cada Transform e cada Shape."""
+        # Cada Transform do caminho vira uma instância com o índice da instância pai (0 é a
+        # raiz da cena) e cada Shape uma chamada de desenho com o índice do seu Transform.
+        self.instances = []   # (Transform, índice da instância pai)
+        self.geometries = []  # geometria de cada chamada de desenho
+        self.appearances = []  # aparência de cada chamada de desenho
+        owners = []           # instância dona de cada chamada de desenho
+        materials = {}        # índice na tabela de materiais de cada aparência
+
+        self.materials = []   # tabela de cores (get_colors) de cada aparência
+        self.material_users = {}  # índices na tabela de cores que usam cada Material
+
+        stack = [(child, 0) for child in reversed(children)]
+        while stack:
+            node, parent = stack.pop()
+            if isinstance(node, Transform):
+                self.instances.append((node, parent))
+                node.draw_list = self
+                stack.extend((child, len(self.instances)) for child in reversed(node.children))
+            elif isinstance(node, Shape) and node.geometry:
+                node.geometry.draw_list = self
+                appearance = node.appearance
+                if id(appearance) not in materials:
+                    materials[id(appearance)] = len(self.materials)
+                    self.materials.append(get_colors(appearance))
+                    if appearance and appearance.material:
+                        appearance.material.draw_list = self
+                        self.material_users.setdefault(id(appearance.material), []).append(
+                            (materials[id(appearance)], appearance))
+                self.geometries.append(node.geometry)
+                self.appearances.append(appearance)
+                owners.append(parent)
+
+        # Vetores da lista: matriz do mundo de cada instância (0 é a identidade), dona e
+        # índice de material de cada chamada de desenho
+        self.owners = np.array(owners, dtype=np.int64)
+        self.material = np.array([materials[id(appearance)] for appearance in self.appearances],
+                                 dtype=np.int64)
+        self.worlds = np.tile(np.identity(4), (len(self.instances) + 1, 1, 1))
+        self.matrices = self.worlds[self.owners]
+
+        # Chamadas com a mesma geometria e aparência (nós repetidos com USE) são agrupadas
+        # num só desenho instanciado, na ordem da primeira ocorrência. Só as geometrias
+        # com teste de profundidade podem mudar de ordem; as outras (as 2D) dependem da
+        # ordem do documento, então são desenhadas sozinhas e separam os agrupamentos.
+        batches = []
+        group = {}
+        for index, (geometry, appearance) in enumerate(zip(self.geometries, self.appearances)):
+            if geometry.depth_tested:
+                if (id(geometry), id(appearance)) not in group:
+                    group[(id(geometry), id(appearance))] = []
+                    batches.append(group[(id(geometry), id(appearance))])
+                group[(id(geometry), id(appearance))].append(index)
+            else:
+                batches.append([index])
+                group = {}
+        self.batches = [np.array(indices, dtype=np.int64) for indices in batches]
+
+        # Hierarquia de volumes envoltórios (BVH) seguindo a dos Transforms: o pai de cada
+        # instância, as instâncias de cada nível de profundidade e os pares (chamada,
+        # instância ancestral) usados para unir as caixas das chamadas em cada instância
+        self.parents = np.array([0] + [parent for _, parent in self.instances], dtype=np.int64)
+        depth = np.zeros(len(self.parents), dtype=np.int64)
+        for index, (_, parent) in enumerate(self.instances, 1):
+            depth[index] = depth[parent] + 1
+        self.levels = [np.flatnonzero(depth == level) for level in range(1, depth.max() + 1)]
+        pairs = []
+        for index, owner in enumerate(owners):
+            while owner:
+                pairs.append((index, owner))
+                owner = self.instances[owner - 1][1]
+        pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        self.pair_draws, self.pair_instances = pairs[:, 0], pairs[:, 1]
+
+        # Caixas informadas no arquivo (bboxCenter e bboxSize) valem para toda a subárvore
+        self.hinted = np.array([index for index, (node, _) in enumerate(self.instances, 1)
+                                if min(node.bboxSize) >= 0], dtype=np.int64)
+        self.hints = np.array([[np.subtract(node.bboxCenter, np.divide(node.bboxSize, 2)),
+                                np.add(node.bboxCenter, np.divide(node.bboxSize, 2))]
+                               for node, _ in (self.instances[index - 1] for index in self.hinted)],
+                              dtype=np.float64).reshape(-1, 2, 3)
+        self.bounds_dirty = True
+        self.dirty = {node for node, _ in self.instances}  # Transforms alterados
+
+    def changed(self, node):
+        """Registra a alteração de um Transform, geometria ou Material usado na lista."""
+        if isinstance(node, Transform):
+            self.dirty.add(node)
+        elif isinstance(node, X3DGeometryNode):
+            self.bounds_dirty = True
+        else:
+            for index, appearance in self.material_users.get(id(node), []):
+                self.materials[index] = get_colors(appearance)
+
+    def refresh(self):
+        """Recalcula só as matrizes dos Transforms alterados e de seus descendentes."""
+        if not self.dirty:
+            return
+        changed = np.zeros(len(self.worlds), dtype=bool)
+        for index, (node, parent) in enumerate(self.instances, 1):
+            if changed[parent] or node in self.dirty:
+                self.worlds[index] = self.worlds[parent] @ node.local_matrix()
+                changed[index] = True
+        self.matrices = self.worlds[self.owners]
+        self.dirty = set()
+        self.bounds_dirty = True
+
+    def update_bounds(self):
+        """Recalcula as caixas envoltórias no sistema do mundo das chamadas e das instâncias."""
+        # Geometrias sem caixa conhecida (as 2D, por exemplo) nunca são descartadas
+        local = {}
+        for geometry in self.geometries:
+            if id(geometry) not in local:
+                local[id(geometry)] = geometry.bounds()
+        boxes = [local[id(geometry)] for geometry in self.geometries]
+        known = np.array([box is not None for box in boxes], dtype=bool)
+        lower = np.array([box[0] if box else np.zeros(3) for box in boxes]).reshape(-1, 3)
+        upper = np.array([box[1] if box else np.zeros(3) for box in boxes]).reshape(-1, 3)
+        lower, upper = transform_boxes(lower, upper, self.matrices)
+        lower[~known] = -np.inf
+        upper[~known] = np.inf
+        self.draw_bounds = (lower, upper)
+
+        # A caixa de cada instância une as caixas de todas as chamadas abaixo dela
+        instance_lower = np.full((len(self.worlds), 3), np.inf)
+        instance_upper = np.full((len(self.worlds), 3), -np.inf)
+        np.minimum.at(instance_lower, self.pair_instances, lower[self.pair_draws])
+        np.maximum.at(instance_upper, self.pair_instances, upper[self.pair_draws])
+        if len(self.hinted):
+            hint_lower, hint_upper = transform_boxes(self.hints[:, 0], self.hints[:, 1],
+                                                     self.worlds[self.hinted])
+            instance_lower[self.hinted] = hint_lower
+            instance_upper[self.hinted] = hint_upper
+        self.instance_bounds = (instance_lower, instance_upper)
+        self.bounds_dirty = False
+
+    def visible(self, planes):
+        """Chamadas de desenho dentro do volume de visualização definido pelos planos."""
+        # Uma instância fora do volume descarta toda a sua subárvore, nível a nível
+        instances = inside_frustum(planes, *self.instance_bounds)
+        instances[0] = True
+        for level in self.levels:
+            instances[level] &= instances[self.parents[level]]
+        return inside_frustum(planes, *self.draw_bounds) & instances[self.owners]
+
+    def render(self):
+        """Desenha toda a lista num único laço."""
+        if not all(func in X3D.renderer for func in ("Transform_in", "Transform_out")):
+            raise Exception("Transform(s) não foram implementados.")
+        self.refresh()
+
+        transform_in = X3D.renderer["Transform_in"]
+        transform_out = X3D.renderer["Transform_out"]
+
+        # Descarta as chamadas fora do volume de visualização antes de transformar vértices
+        visible = None
+        if "Frustum" in X3D.renderer:
+            if self.bounds_dirty:
+                self.update_bounds()
+            visible = self.visible(X3D.renderer["Frustum"]())
+
+        current = None
+        for batch in self.batches:
+            if visible is not None:
+                batch = batch[visible[batch]]
+                if not len(batch):
+                    continue
+            # A aparência só é aplicada de novo quando muda entre chamadas consecutivas
+            index = batch[0]
+            appearance = self.appearances[index]
+            if appearance is not current and appearance:
+                appearance.render()
+            elif not appearance:
+                X3D.current_texture = []
+            current = appearance
+
+            # Com várias instâncias a matriz do modelo é uma pilha (K, 4, 4) de matrizes
+            X3D.current_matrix = self.matrices[batch] if len(batch) > 1 else self.matrices[index]
+            transform_in(translation=None, scale=None, rotation=None, matrix=X3D.current_matrix)
+            self.geometries[index].render(appearance, colors=self.materials[self.material[index]])
+            transform_out()
+        X3D.current_matrix = self.worlds[0]
 
 # Core component
 
@@ -355,6 +968,7 @@ class X3DNode:
     """Nó abstrato que é o tipo base para todos os nós no sistema X3D."""
 
     named_nodes = {}  # Dicionário com todos os nós X3D nomeados
+    draw_list = None  # lista de desenho avisada quando o nó muda (ver Scene.compile)
 
     def __init__(self, node=None):
         """Parse do nó X3D."""
@@ -362,6 +976,9 @@ class X3DNode:
             self.name = node.attrib["DEF"].strip()
             X3DNode.named_nodes[self.name] = self
 
+    def field_changed(self, field):
+        """Notifica que um campo do nó foi alterado (por exemplo por um ROUTE)."""
+
 class X3DChildNode(X3DNode):
     """Nó abstrato como base para campos children, addChildren, and removeChildren."""
 
@@ -413,7 +1030,7 @@ class TimeSensor(X3DTimeDependentNode, X3DSensorNode):
 
         # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
         self.fraction_changed = X3D.renderer["TimeSensor"](cycleInterval=self.cycleInterval,
-                                                           loop=self.loop)
+                                                           loop=self.loop, now=X3D.now)
 
 
 # Grouping component
@@ -434,6 +1051,8 @@ class X3DGroupingNode(X3DChildNode):
 class Transform(X3DGroupingNode):
     """Nó de agrupamento que define um sistema de coordenadas para seus nós filhos."""
 
+    transform_fields = ("translation", "rotation", "scale", "center", "scaleOrientation")
+
     def __init__(self, node):
         """Parse do nó X3d."""
         super().__init__(node) # Chama construtor da classe pai
@@ -443,20 +1062,44 @@ class Transform(X3DGroupingNode):
         self.center = SFVec3f(node, "center", [0, 0, 0])
         self.scaleOrientation = SFRotation(node, "scaleOrientation", [0, 0, 1, 0])
 
+        # Matriz local guardada entre os quadros, só é recalculada quando um campo da
+        # transformação muda (por um ROUTE, por exemplo). As matrizes do mundo são
+        # calculadas pela lista de desenho da cena (ver DrawList.refresh).
+        self.local = None  # None indica matriz local desatualizada
+
+    def field_changed(self, field):
+        """Invalida a matriz local guardada quando um campo da transformação muda."""
+        if field in Transform.transform_fields:
+            self.local = None
+            if self.draw_list:
+                self.draw_list.changed(self)
+
+    def local_matrix(self):
+        """Matriz local do Transform, recalculada só se algum campo mudou."""
+        if self.local is None:
+            self.local = transformacoes.transform(self.translation, self.rotation, self.scale,
+                                                  self.center, self.scaleOrientation)
+        return self.local
+
     def render(self):
         """Rotina de renderização."""
         if not all(func in X3D.renderer for func in ("Transform_in", "Transform_out")):
             raise Exception("Transform(s) não foram implementados.")
 
+        parent = X3D.current_matrix
+        X3D.current_matrix = parent @ self.local_matrix()
+
         # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
         X3D.renderer["Transform_in"](translation=self.translation,
                                      scale=self.scale,
-                                     rotation=self.rotation)
+                                     rotation=self.rotation,
+                                     matrix=X3D.current_matrix)
 
         for child in self.children:
             child.render()
 
         X3D.renderer["Transform_out"]()  # Tira a transformação da pilha
+        X3D.current_matrix = parent
 
 
 # Shape component
@@ -516,6 +1159,11 @@ class Material(X3DMaterialNode):
         X3D.current_color["shininess"] = self.shininess
         X3D.current_color["transparency"] = self.transparency
 
+    def field_changed(self, field):
+        """Atualiza as cores guardadas na lista de desenho."""
+        if self.draw_list:
+            self.draw_list.changed(self)
+
 
 class X3DTextureNode(X3DAppearanceChildNode):
     """Nó abstrato base para todos os tipos de nó que especificam imagens de textura."""
@@ -546,6 +1194,7 @@ class ImageTexture(X3DTexture2DNode):
     def render(self):
         """Rotina de renderização."""
         X3D.current_texture = self.url
+        X3D.current_repeat = (self.repeatS, self.repeatT)
 
 class Appearance(X3DAppearanceNode):
     """Especifica as propriedades visuais da geometria."""
@@ -567,6 +1216,8 @@ class Appearance(X3DAppearanceNode):
             self.material.render()
         if self.texture:
             self.texture.render()
+        else:
+            X3D.current_texture = []  # a textura da aparência anterior não vale aqui
 
 class Shape(X3DShapeNode):
     """Define aparência e geometria, que são usados para criar objetos renderizados."""
@@ -579,6 +1230,8 @@ class Shape(X3DShapeNode):
         """Rotina de renderização."""
         if self.appearance:
             self.appearance.render()
+        else:
+            X3D.current_texture = []
         if self.geometry:
             self.geometry.render(self.appearance)
 
@@ -587,14 +1240,27 @@ class Shape(X3DShapeNode):
 class X3DGeometryNode(X3DNode):
     """Este é o tipo de nó base para todas as geometrias em X3D."""
 
+    depth_tested = False  # desenhada com teste de profundidade (GL.draw_triangles)
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
 
+    def bounds(self):
+        """Caixa envoltória (mínimo, máximo) no sistema do modelo, None se desconhecida."""
+        return None
+
+    def field_changed(self, field):
+        """Avisa a lista de desenho que a caixa envoltória pode ter mudado."""
+        if self.draw_list:
+            self.draw_list.changed(self)
+
 
 class X3DComposedGeometryNode(X3DGeometryNode):
     """Este é o tipo de nó base para toda a geometria 3D composta em X3D."""
 
+    depth_tested = True
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -608,6 +1274,18 @@ class X3DComposedGeometryNode(X3DGeometryNode):
         self.normalPerVertex = SFBool(node, "normalPerVertex", True)
         self.solid = SFBool(node, "solid", True)
 
+        # Nós de propriedades avisam a geometria quando seus valores mudam
+        for prop in (self.coord, self.texCoord):
+            if isinstance(prop, X3DGeometricPropertyNode):
+                prop.users.append(self)
+
+    def bounds(self):
+        """Caixa envoltória dos pontos do nó de coordenadas."""
+        if not self.coord or not self.coord.point:
+            return None
+        point = np.asarray(self.coord.point, dtype=np.float64).reshape(-1, 3)
+        return point.min(axis=0), point.max(axis=0)
+
 
 class X3DGeometricPropertyNode(X3DNode):
     """Nó base para todos os tipos de nós de propriedades geométricas definidos no X3D."""
@@ -615,6 +1293,12 @@ class X3DGeometricPropertyNode(X3DNode):
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
+        self.users = []  # geometrias que usam este nó
+
+    def field_changed(self, field):
+        """Repassa a alteração para as geometrias que usam este nó."""
+        for user in self.users:
+            user.field_changed(type(self).__name__)
 
 
 class X3DCoordinateNode(X3DGeometricPropertyNode):
@@ -662,12 +1346,12 @@ class TriangleSet(X3DComposedGeometryNode):
         # Preview
         # Implemente se desejar
 
-    def render(self, appearance=None):
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "TriangleSet" not in X3D.renderer:
             raise Exception("TriangleSet não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.coord and self.coord.point:
             # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
             X3D.renderer["TriangleSet"](point=self.coord.point, colors=colors)
@@ -683,12 +1367,12 @@ class TriangleStripSet(X3DComposedGeometryNode):
         # Preview
         # Implemente se desejar
 
-    def render(self, appearance=None):
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "TriangleStripSet" not in X3D.renderer:
             raise Exception("TriangleStripSet não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.coord and self.coord.point and self.stripCount:
             # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
             X3D.renderer["TriangleStripSet"](point=self.coord.point,
@@ -706,12 +1390,12 @@ class IndexedTriangleStripSet(X3DComposedGeometryNode):
         # Preview
         # Implemente se desejar
 
-    def render(self, appearance=None):
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "IndexedTriangleStripSet" not in X3D.renderer:
             raise Exception("IndexedTriangleStripSet não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if "IndexedTriangleStripSet" in X3D.renderer:
             if self.coord and self.coord.point and self.index:
                 # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
@@ -738,12 +1422,12 @@ class Polypoint2D(X3DGeometryNode):
             X3D.preview.pontos.append({'appearance': X3D.current_appearance,
                                        'points': points})
 
-    def render(self, appearance=None):
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "Polypoint2D" not in X3D.renderer:
             raise Exception("Polypoint2D não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.point:
             X3D.renderer["Polypoint2D"](point=self.point, colors=colors)
 
@@ -764,12 +1448,12 @@ class Polyline2D(X3DGeometryNode):
             X3D.preview.linhas.append({'appearance': X3D.current_appearance,
                                        'lines': points})
 
-    def render(self, appearance=None):
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "Polyline2D" not in X3D.renderer:
             raise Exception("Polyline2D não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.lineSegments:
             X3D.renderer["Polyline2D"](lineSegments=self.lineSegments, colors=colors)
 
@@ -788,12 +1472,12 @@ class Circle2D(X3DGeometryNode):
             X3D.preview.circulos.append({'appearance': X3D.current_appearance,
                                          'radius': radius})
 
-    def render(self, appearance=None):
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "Circle2D" not in X3D.renderer:
             raise Exception("Circle2D não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.radius:
             X3D.renderer["Circle2D"](radius=self.radius, colors=colors)
 
@@ -815,12 +1499,12 @@ class TriangleSet2D(X3DGeometryNode):
             X3D.preview.poligonos.append({'appearance': X3D.current_appearance,
                                           'vertices': points})
 
-    def render(self, appearance=None):
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "TriangleSet2D" not in X3D.renderer:
             raise Exception("TriangleSet2D não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.vertices:
             X3D.renderer["TriangleSet2D"](vertices=self.vertices, colors=colors)
 
@@ -881,17 +1565,24 @@ class Viewpoint(X3DViewpointNode):
 class Box(X3DGeometryNode):
     """Classe responsável por geometria Box, que é um paralelepípedo centro no (0,0,0)."""
 
+    depth_tested = True
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
         self.size = SFVec3f(node, "size", [2, 2, 2])
 
-    def render(self, appearance=None):
+    def bounds(self):
+        """Caixa envoltória centrada na origem."""
+        half = np.abs(np.asarray(self.size, dtype=np.float64)) / 2
+        return -half, half
+
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "Box" not in X3D.renderer:
             raise Exception("Box não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.size:
             X3D.renderer["Box"](size=self.size, colors=colors)
 
@@ -899,17 +1590,24 @@ class Box(X3DGeometryNode):
 class Sphere(X3DGeometryNode):
     """Classe responsável por geometria Sphere, que é uma esfera com centro no (0,0,0)."""
 
+    depth_tested = True
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
         self.radius = SFFloat(node, "radius", 1)
 
-    def render(self, appearance=None):
+    def bounds(self):
+        """Caixa envoltória da esfera."""
+        half = np.full(3, float(self.radius))
+        return -half, half
+
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "Sphere" not in X3D.renderer:
             raise Exception("Sphere não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.radius:
             X3D.renderer["Sphere"](radius=self.radius, colors=colors)
 
@@ -917,42 +1615,88 @@ class Sphere(X3DGeometryNode):
 class Cone(X3DGeometryNode):
     """Classe responsável por geometria Cone, que é um cone com centro no (0,0,0)."""
 
+    depth_tested = True
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
         self.bottomRadius  = SFFloat(node, "bottomRadius", 1)
         self.height = SFFloat(node, "height", 2)
 
-    def render(self, appearance=None):
+    def bounds(self):
+        """Caixa envoltória do cone com eixo em y."""
+        half = np.array([self.bottomRadius, self.height / 2, self.bottomRadius])
+        return -half, half
+
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "Cone" not in X3D.renderer:
             raise Exception("Cone não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.height and self.bottomRadius:
             X3D.renderer["Cone"](bottomRadius=self.bottomRadius, height=self.height, colors=colors)
 
 class Cylinder(X3DGeometryNode):
     """Classe responsável por geometria Cylinder, que é uma cilindro com centro no (0,0,0)."""
 
+    depth_tested = True
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
         self.radius = SFFloat(node, "radius", 1)
         self.height = SFFloat(node, "height", 2)
 
-    def render(self, appearance=None):
+    def bounds(self):
+        """Caixa envoltória do cilindro com eixo em y."""
+        half = np.array([self.radius, self.height / 2, self.radius])
+        return -half, half
+
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "Cylinder" not in X3D.renderer:
             raise Exception("Cylinder não foi implementado.")
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
         if self.radius and self.height:
             X3D.renderer["Cylinder"](radius=self.radius, height=self.height, colors=colors)
 
+class Mesh:
+    """Malha de triângulos compilada, pronta para ser enviada à renderização."""
+
+    def __init__(self, vertices, triangles, colors=None, uvs=None):
+        """Armazena os vetores contíguos da malha."""
+        self.vertices = vertices    # coordenadas (V, 3) em float32
+        self.triangles = triangles  # índices (T, 3) dos vértices em int32
+        self.colors = colors        # cores (V, 3) em float32 de cada vértice (ou None)
+        self.uvs = uvs              # coordenadas de textura (V, 2) em float32 (ou None)
+
+
+def triangulate(index):
+    """Divide polígonos separados por -1 em leques de triângulos."""
+    # Retorna as posições (T, 3) em index dos cantos de cada triângulo e o número do
+    # polígono de origem de cada triângulo.
+    index = np.asarray(index, dtype=np.int64)
+    if index.size == 0 or index[-1] != -1:
+        index = np.append(index, -1)
+    ends = np.flatnonzero(index == -1)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    count = np.maximum(ends - starts - 2, 0)  # triângulos de cada polígono
+    first = np.repeat(starts, count)
+    step = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count) + 1
+    corners = np.stack((first, first + step, first + step + 1), axis=1)
+    return corners, np.repeat(np.arange(len(starts)), count)
+
+
 class IndexedFaceSet(X3DComposedGeometryNode):
     """Classe responsável por geometria Indexed Face Set, que é uma malha de polígonos."""
 
+    # Campos que, quando alterados, exigem recompilar a malha
+    geometry_fields = ("coord", "color", "texCoord", "coordIndex", "colorIndex",
+                       "texCoordIndex", "colorPerVertex", "Coordinate", "Color",
+                       "TextureCoordinate")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -960,8 +1704,68 @@ class IndexedFaceSet(X3DComposedGeometryNode):
         self.coordIndex = MFInt32(node, "coordIndex", [])
         self.colorIndex = MFInt32(node, "colorIndex", [])
         self.texCoordIndex = MFInt32(node, "texCoordIndex", [])
-
-    def render(self, appearance=None):
+        if isinstance(self.color, X3DGeometricPropertyNode):
+            self.color.users.append(self)
+
+        # Compila a malha uma única vez durante a leitura
+        self.mesh = None
+        self.compile()
+
+    def field_changed(self, field):
+        """Invalida a malha compilada se um campo de geometria foi alterado."""
+        if field in IndexedFaceSet.geometry_fields:
+            self.mesh = None
+        super().field_changed(field)
+
+    def compile(self):
+        """Triangula os polígonos e resolve cores e coordenadas de textura por vértice."""
+        if not (self.coord and self.coord.point and self.coordIndex):
+            self.mesh = None
+            return self.mesh
+
+        points = np.asarray(self.coord.point, dtype=np.float32).reshape(-1, 3)
+        index = np.asarray(self.coordIndex, dtype=np.int64)
+        corners, faces = triangulate(index)
+
+        # Para cada canto dos triângulos: índice da coordenada, da cor e da textura
+        keys = [index[corners]]
+        palette = None
+        if self.color and self.color.color:
+            palette = np.asarray(self.color.color, dtype=np.float32).reshape(-1, 3)
+            if self.colorPerVertex:
+                source = np.asarray(self.colorIndex, dtype=np.int64) if self.colorIndex else index
+                keys.append(source[corners])
+            else:
+                source = np.asarray(self.colorIndex, dtype=np.int64) if self.colorIndex else None
+                face_color = source[faces] if source is not None else faces
+                keys.append(np.repeat(face_color[:, np.newaxis], 3, axis=1))
+        uv_points = None
+        if self.texCoord and self.texCoord.point:
+            uv_points = np.asarray(self.texCoord.point, dtype=np.float32).reshape(-1, 2)
+            source = np.asarray(self.texCoordIndex, dtype=np.int64) if self.texCoordIndex else index
+            keys.append(source[corners])
+
+        if len(keys) == 1:
+            # Só coordenadas: os vértices originais são usados diretamente
+            self.mesh = Mesh(points, keys[0].astype(np.int32))
+            return self.mesh
+
+        # Cada combinação distinta (coordenada, cor, textura) vira um vértice da malha
+        combos = np.stack([key.reshape(-1) for key in keys], axis=1)
+        unique, inverse = np.unique(combos, axis=0, return_inverse=True)
+        column = 1
+        colors = None
+        if palette is not None:
+            colors = np.ascontiguousarray(palette[unique[:, column]])
+            column += 1
+        uvs = None
+        if uv_points is not None:
+            uvs = np.ascontiguousarray(uv_points[unique[:, column]])
+        self.mesh = Mesh(np.ascontiguousarray(points[unique[:, 0]]),
+                         inverse.reshape(-1, 3).astype(np.int32), colors, uvs)
+        return self.mesh
+
+    def render(self, appearance=None, colors=None):
         """Rotina de renderização."""
         if "IndexedFaceSet" not in X3D.renderer:
             raise Exception("IndexedFaceSet não foi implementado.")
@@ -977,7 +1781,11 @@ class IndexedFaceSet(X3DComposedGeometryNode):
         if self.texCoord:
             ret_texCoord = self.texCoord.point
 
-        colors = get_colors(appearance)
+        colors = colors or get_colors(appearance)
+
+        # Recompila a malha somente se algum campo de geometria foi alterado
+        if self.mesh is None:
+            self.compile()
 
         if self.coordIndex:
             X3D.renderer["IndexedFaceSet"](coord=ret_coord, coordIndex=self.coordIndex,
@@ -985,7 +1793,8 @@ class IndexedFaceSet(X3DComposedGeometryNode):
                                            colorIndex=self.colorIndex, texCoord=ret_texCoord,
                                            texCoordIndex=self.texCoordIndex,
                                            colors=colors,
-                                           current_texture=X3D.current_texture)
+                                           current_texture=X3D.current_texture,
+                                           mesh=self.mesh, repeat=X3D.current_repeat)
 
 
 # Lighting component
@@ -1100,6 +1909,14 @@ class X3DInterpolatorNode(X3DChildNode):
         self.key = MFFloat(node, "key", [])  # MF<type>     [in,out] keyValue      []
         self.keyValue = MFFloat(node, "keyValue", None)
         self.value_changed = None  #   [S|M]F<type> [out]    value_changed
+        self.changed = True  # avaliado de novo só quando um campo de entrada muda
+        self.interpolator = None  # quadros-chave pré-processados (ver interpoladores)
+
+    def field_changed(self, field):
+        """Notifica que um campo do nó foi alterado (por exemplo por um ROUTE)."""
+        self.changed = True
+        if field != "set_fraction":
+            self.interpolator = None  # chaves ou valores mudaram
 
 class SplinePositionInterpolator(X3DInterpolatorNode):
     """Interpola não linearmente entre uma lista de vetores 3D."""
@@ -1114,11 +1931,15 @@ class SplinePositionInterpolator(X3DInterpolatorNode):
         if "SplinePositionInterpolator" not in X3D.renderer:
             raise Exception("SplinePositionInterpolator não foi implementado.")
 
+        if self.interpolator is None:
+            self.interpolator = interpoladores.Spline(self.key, self.keyValue, self.closed)
         self.value_changed = X3D.renderer["SplinePositionInterpolator"]\
             (set_fraction=self.set_fraction,
              key=self.key,
              keyValue=self.keyValue,
-             closed=self.closed)
+             closed=self.closed,
+             interpolator=self.interpolator)
+        self.changed = False
 
 class OrientationInterpolator(X3DInterpolatorNode):
     """Interpola entre uma lista de valores de rotação especificados no campo keyValue."""
@@ -1132,12 +1953,16 @@ class OrientationInterpolator(X3DInterpolatorNode):
         if "OrientationInterpolator" not in X3D.renderer:
             raise Exception("OrientationInterpolator não foi implementado.")
 
+        if self.interpolator is None:
+            self.interpolator = interpoladores.Orientation(self.key, self.keyValue)
         self.value_changed = X3D.renderer["OrientationInterpolator"](set_fraction=self.set_fraction,
                                                                      key=self.key,
-                                                                     keyValue=self.keyValue)
+                                                                     keyValue=self.keyValue,
+                                                                     interpolator=self.interpolator)
+        self.changed = False
 
 class ROUTE():
-    """."""
+    """Conecta um campo de saída de um nó a um campo de entrada de outro nó."""
 
     def __init__(self, node):
         """Parse do nó X3D."""
@@ -1146,10 +1971,95 @@ class ROUTE():
         self.fromField = SFString(node, "fromField", '')
         self.toNode = SFString(node, "toNode", '')
         self.toField = SFString(node, "toField", '')
+        self.source = None  # nós resolvidos na compilação da cena (ver resolve)
+        self.target = None
+        self.value = None  # último valor enviado, para só propagar mudanças
+        self.sent = False
+
+    def resolve(self):
+        """Troca os nomes dos nós pelas referências e verifica os campos."""
+        for name, field in ((self.fromNode, self.fromField), (self.toNode, self.toField)):
+            if name not in X3DNode.named_nodes:
+                raise Exception(f"ROUTE usa o nó {name} que não foi definido (DEF)")
+            if not hasattr(X3DNode.named_nodes[name], field):
+                raise Exception(f"ROUTE usa o campo {field} que não existe no nó {name}")
+        self.source = X3DNode.named_nodes[self.fromNode]
+        self.target = X3DNode.named_nodes[self.toNode]
+
+    def propagate(self):
+        """Copia o valor para o nó de destino se ele mudou, retornando se houve envio."""
+        value = getattr(self.source, self.fromField)
+        if self.sent and same_value(self.value, value):
+            return False
+        self.value = copy.copy(value)  # listas podem ser alteradas no próprio nó de origem
+        self.sent = True
+        setattr(self.target, self.toField, value)
+        self.target.field_changed(self.toField)
+        return True
 
     def render(self):
         """Rotina de renderização."""
-        fromNode = X3DNode.named_nodes[self.fromNode]
-        value = getattr(fromNode, self.fromField)
-        toNode = X3DNode.named_nodes[self.toNode]
-        setattr(toNode, self.toField, value)
+        if self.source is None:
+            self.resolve()
+        self.propagate()
+
+
+def same_value(old, new):
+    """Compara dois valores de campo (números, listas ou vetores do Numpy)."""
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        return old is not None and new is not None and np.array_equal(old, new)
+    return old == new
+
+
+class EventGraph:
+    """Cascata de eventos da cena: nós em ordem topológica das ROUTEs já resolvidas."""
+
+    def __init__(self, nodes, routes):
+        """Ordena os nós de eventos (em ordem do documento) conforme as ROUTEs entre eles."""
+        # Um nó só é tratado depois de todos os nós que enviam valores para ele, assim
+        # um interpolador sempre recebe a fração do quadro atual. Os nós de destino que
+        # não são de eventos (Transform, Material, geometrias) só recebem os valores.
+        nodes = list(nodes)
+        active = len(nodes)  # os primeiros nós são tratados a cada quadro
+        position = {id(node): index for index, node in enumerate(nodes)}
+        for route in routes:
+            route.resolve()
+            for node in (route.source, route.target):
+                if id(node) not in position:
+                    position[id(node)] = len(nodes)
+                    nodes.append(node)
+
+        outgoing = [[] for _ in nodes]
+        targets = [[] for _ in nodes]
+        incoming = [0] * len(nodes)
+        for route in routes:
+            source, target = position[id(route.source)], position[id(route.target)]
+            outgoing[source].append(route)
+            if target != source:
+                targets[source].append(target)
+                incoming[target] += 1
+
+        # Ordenação topológica estável: entre os nós prontos vem primeiro o do documento
+        ready = [index for index, count in enumerate(incoming) if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            index = heapq.heappop(ready)
+            order.append(index)
+            for target in targets[index]:
+                incoming[target] -= 1
+                if incoming[target] == 0:
+                    heapq.heappush(ready, target)
+
+        # Nós em ciclos de ROUTEs seguem a ordem do documento (cada rota envia uma vez)
+        done = set(order)
+        order += [index for index in range(len(nodes)) if index not in done]
+        self.steps = [(nodes[index], index < active, outgoing[index]) for index in order]
+
+    def run(self):
+        """Trata os nós de eventos de um quadro, propagando só os valores que mudaram."""
+        for node, active, routes in self.steps:
+            if active and getattr(node, "changed", True):
+                node.render()
+            for route in routes:
+                route.propagate()